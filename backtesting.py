@@ -0,0 +1,156 @@
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import contextmanager
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+
+from model_backends import DEFAULT_BACKEND, create_estimator
+
+# macierz danych workera: (X, y) jako widoki na pamięć współdzieloną, ustawiane w _attach_matrix
+_worker = {}
+
+
+@dataclass
+class BacktestResult:
+    """Prognozy wszystkich foldów oraz metryki: per fold, łączne, per godzina i per miesiąc."""
+
+    predictions: pd.DataFrame
+    folds: pd.DataFrame
+    aggregate: dict
+    by_hour: pd.DataFrame
+    by_month: pd.DataFrame
+
+
+def _metrics(y_true, y_pred):
+    return {
+        "rows": len(y_true),
+        "mae": mean_absolute_error(y_true, y_pred),
+        "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+        "r2": r2_score(y_true, y_pred) if len(y_true) > 1 else float("nan"),
+    }
+
+
+def _grouped_metrics(predictions, column):
+    return pd.DataFrame(
+        {
+            key: _metrics(group["y_true"], group["y_pred"])
+            for key, group in predictions.groupby(column)
+        }
+    ).T.rename_axis(column).infer_objects()
+
+
+def _attach_matrix(shm_name, shape, n_features):
+    """Inicjalizator workera: podłącza macierz z pamięci współdzielonej bez kopiowania."""
+    shm = shared_memory.SharedMemory(name=shm_name)
+    matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+    _worker.update(shm=shm, X=matrix[:, :n_features], y=matrix[:, n_features])
+
+
+def fit_predict_fold(train_end, test_end, backend, model_params):
+    """Trening na wierszach [0, train_end) i prognoza dla [train_end, test_end)."""
+    X, y = _worker["X"], _worker["y"]
+    model = create_estimator(backend, model_params)
+    model.fit(X[:train_end], y[:train_end])
+    return model.predict(X[train_end:test_end])
+
+
+@contextmanager
+def shared_fold_pool(data, features, target, max_workers=None):
+    """
+    Pula procesów, której workery widzą macierz [cechy | cel] z data przez pamięć
+    współdzieloną; zadania fit_predict_fold odwołują się do wierszy tej macierzy.
+    """
+    n_features = len(features)
+    shape = (len(data), n_features + 1)
+    shm = shared_memory.SharedMemory(create=True, size=max(int(np.prod(shape)) * 8, 1))
+    try:
+        matrix = np.ndarray(shape, dtype=np.float64, buffer=shm.buf)
+        matrix[:, :n_features] = data[features].to_numpy(dtype=np.float64)
+        matrix[:, n_features] = data[target].to_numpy(dtype=np.float64)
+        del matrix
+        with ProcessPoolExecutor(
+            max_workers=max_workers,
+            initializer=_attach_matrix,
+            initargs=(shm.name, shape, n_features),
+        ) as pool:
+            yield pool
+    finally:
+        shm.close()
+        shm.unlink()
+
+
+def make_folds(dates, start_date, end_date, step_days=1, horizon_days=1, min_train_days=30):
+    """
+    Foldy z rozszerzającym się oknem: dla każdego dnia prognozy D z [start_date, end_date]
+    (co step_days) trening na wszystkich dniach przed D, test na [D, D + horizon_days).
+    dates: posortowane rosnąco daty wierszy. Zwraca listę (D, koniec treningu, koniec testu).
+    """
+    day_numbers = pd.to_datetime(dates).to_numpy().astype("datetime64[D]")
+    first_day = day_numbers[0] if len(day_numbers) else None
+    folds = []
+    for day in pd.date_range(start_date, end_date, freq=f"{step_days}D"):
+        day = day.to_datetime64().astype("datetime64[D]")
+        if first_day is None or (day - first_day).astype(int) < min_train_days:
+            continue
+        train_end = np.searchsorted(day_numbers, day, side="left")
+        test_end = np.searchsorted(
+            day_numbers, day + np.timedelta64(horizon_days, "D"), side="left"
+        )
+        if test_end > train_end:
+            folds.append((pd.Timestamp(day).date(), int(train_end), int(test_end)))
+    return folds
+
+
+def backtest(
+    df,
+    features,
+    target,
+    start_date,
+    end_date,
+    backend=DEFAULT_BACKEND,
+    model_params=None,
+    step_days=1,
+    horizon_days=1,
+    min_train_days=30,
+    max_workers=None,
+):
+    """
+    Backtest prognozy z wyprzedzeniem horizon_days (domyślnie na kolejny dzień) z rozszerzającym
+    się oknem treningowym. Foldy liczone są równolegle w puli procesów; macierz cech i celu
+    trafia raz do pamięci współdzielonej, a workery trenują na jej widokach (bez kopii danych).
+    """
+    data = df[df[target].notna()].sort_values(["date", "hour"], kind="stable")
+    folds = make_folds(
+        data["date"], start_date, end_date, step_days, horizon_days, min_train_days
+    )
+    if not folds:
+        raise ValueError(f"Brak foldów backtestu w okresie {start_date} - {end_date}")
+
+    with shared_fold_pool(data, features, target, max_workers) as pool:
+        futures = [
+            pool.submit(fit_predict_fold, train_end, test_end, backend, model_params)
+            for _, train_end, test_end in folds
+        ]
+        fold_predictions = [future.result() for future in futures]
+
+    parts = []
+    for (day, train_end, test_end), y_pred in zip(folds, fold_predictions):
+        part = data.iloc[train_end:test_end][["date", "hour"]].copy()
+        part["fold"] = day
+        part["train_rows"] = train_end
+        part["y_true"] = data[target].iloc[train_end:test_end].to_numpy()
+        part["y_pred"] = y_pred
+        parts.append(part)
+    predictions = pd.concat(parts, ignore_index=True)
+    predictions["month"] = pd.to_datetime(predictions["date"]).dt.month
+
+    return BacktestResult(
+        predictions=predictions,
+        folds=_grouped_metrics(predictions, "fold"),
+        aggregate=_metrics(predictions["y_true"], predictions["y_pred"]),
+        by_hour=_grouped_metrics(predictions, "hour"),
+        by_month=_grouped_metrics(predictions, "month"),
+    )
@@ -1,15 +1,35 @@
+import time
 import pandas as pd
 import numpy as np
-from sklearn.ensemble import RandomForestRegressor
 from sklearn.model_selection import train_test_split
 from sklearn.metrics import mean_absolute_error, mean_squared_error, r2_score
+from model_backends import DEFAULT_BACKEND, create_estimator
+from model_registry import data_fingerprint
+from lag_features import add_lag_features, lag_feature_names, recursive_forecast
+from backtesting import backtest
+from forest_quantiles import band_name, forest_quantiles
+from compact_forest import CompactForest
+from tuning import tune
+
+# liczba wpisów historii metryk przechowywanych w rejestrze
+METRICS_HISTORY_LIMIT = 365
 
 class BasePredictor:
-    def __init__(self, input_path, output_pred_path, output_pivot_path, features, target, pivot_value):
+    def __init__(self, input_path, output_pred_path, output_pivot_path, features=None, target=None, pivot_value=None, registry=None, model_name=None, backend=None, model_params=None, lags=(), rolling_windows=(), quantiles=(), compact=None, feature_set=None):
         self.input_path = input_path
         self.output_pred_path = output_pred_path
         self.output_pivot_path = output_pivot_path
-        self.features = features
+        # feature_set: deklaracja cech i celu (feature_store.FeatureSet) - zastępuje features/target
+        if feature_set is not None:
+            features = list(feature_set.features)
+            target = feature_set.target
+        if features is None or target is None:
+            raise ValueError("BasePredictor wymaga features i target albo feature_set")
+        self.feature_set = feature_set
+        # lags/rolling_windows: cechy opóźnione celu (lag_<k>, rolling_mean_<w>) w godzinach
+        self.lags = tuple(lags)
+        self.rolling_windows = tuple(rolling_windows)
+        self.features = features + lag_feature_names(self.lags, self.rolling_windows)
         self.target = target
         self.pivot_value = pivot_value
         self.df = None
@@ -17,6 +37,29 @@ class BasePredictor:
         self.mae = None
         self.rmse = None
         self.r2 = None
+        # registry: ModelRegistry - pozwala pominąć trening, gdy dane się nie zmieniły
+        self.registry = registry
+        self.model_name = model_name or target
+        # backend: nazwa z model_backends.MODEL_BACKENDS, model_params nadpisują jego parametry;
+        # bez backendu używana jest konfiguracja z tuningu zapisana w rejestrze lub domyślna
+        tuned = None
+        if backend is None and registry is not None:
+            tuned = registry.load_tuned_config(self.model_name)
+        if tuned is not None:
+            backend = tuned["backend"]
+            model_params = {**tuned["params"], **(model_params or {})}
+        self.backend = backend or DEFAULT_BACKEND
+        self.model_params = model_params or {}
+        # metrics_history: kolejne treningi pełne i przyrostowe (tryb, metryki, czas, liczba drzew)
+        self.metrics_history = []
+        # quantiles: poziomy przedziałów prognozy (np. 0.1, 0.5, 0.9) liczone z drzew lasu
+        # do kolumn <cel>_p10 itd.; puste - tylko prognoza punktowa
+        self.quantiles = tuple(quantiles)
+        # compact: opcje CompactForest.from_sklearn (np. {} lub {"max_depth": 12}) - po treningu
+        # las zamieniany jest na płaskie tablice NumPy; None - model sklearn bez zmian
+        self.compact = compact
+        # history: wiersze z etykietą z ostatniego treningu - źródło opóźnień przy predykcji
+        self.history = None
 
     def load_data_from_excel(self):
         self.df = pd.read_excel(self.input_path)
@@ -28,27 +71,260 @@ class BasePredictor:
     def load_data(self, df):
         self.df = df.copy()
 
+    def _fingerprint_columns(self):
+        key_cols = [col for col in ("date", "hour") if col in self.df.columns]
+        return list(dict.fromkeys(key_cols + self.features + [self.target]))
+
+    def _model_config(self):
+        config = {"backend": self.backend, "params": self.model_params}
+        if self.lags or self.rolling_windows:
+            config["lags"] = list(self.lags)
+            config["rolling_windows"] = list(self.rolling_windows)
+        return config
+
+    def _training_rows(self):
+        """Wiersze z etykietą; przy włączonych opóźnieniach z dołączonymi cechami lag_*/rolling_mean_*."""
+        df = self.df
+        if self.lags or self.rolling_windows:
+            df = add_lag_features(df, self.target, self.lags, self.rolling_windows)
+        self.history = df[df[self.target].notna()]
+        return self.history
+
+    def _use_registry_entry(self, model, meta):
+        self.model = model
+        self.mae = meta["metrics"]["mae"]
+        self.rmse = meta["metrics"]["rmse"]
+        self.r2 = meta["metrics"]["r2"]
+        self.metrics_history = meta.get("metrics_history", [])
+        self._compact_model()
+        print(f"{self.target}: dane bez zmian, wczytano model {self.model_name} z rejestru")
+
+    def _load_from_registry(self, fingerprint):
+        entry = self.registry.load(
+            self.model_name, fingerprint, self.features, self._model_config(), self.compact
+        )
+        if entry is None:
+            return False
+        self._use_registry_entry(*entry)
+        return True
+
+    def _set_metrics(self, y_true, y_pred):
+        self.mae = mean_absolute_error(y_true, y_pred)
+        self.rmse = np.sqrt(mean_squared_error(y_true, y_pred))
+        self.r2 = r2_score(y_true, y_pred) if len(y_true) > 1 else float("nan")
+
+    def _record_metrics(self, mode, fit_seconds, rows):
+        self.metrics_history.append(
+            {
+                "mode": mode,
+                "trained_at": pd.Timestamp.now(tz="UTC").isoformat(),
+                "mae": float(self.mae),
+                "rmse": float(self.rmse),
+                "r2": float(self.r2),
+                "fit_seconds": round(fit_seconds, 3),
+                "rows": int(rows),
+                "n_estimators": len(getattr(self.model, "estimators_", [])) or None,
+            }
+        )
+        self.metrics_history = self.metrics_history[-METRICS_HISTORY_LIMIT:]
+        print(
+            f"{self.target} ({mode}): MAE={self.mae:.2f}, RMSE={self.rmse:.2f}, "
+            f"R2={self.r2:.2f}, trening {fit_seconds:.2f} s"
+        )
+
+    def _compact_model(self):
+        """Zamienia wytrenowany las sklearn na CompactForest, jeśli ustawiono compact."""
+        if self.compact is not None and hasattr(self.model, "estimators_"):
+            self.model = CompactForest.from_sklearn(self.model, **self.compact)
+        return self.model
+
+    def _save_to_registry(self, fingerprint, incremental_updates):
+        sklearn_model = self.model
+        compact_model = self._compact_model() if self.compact is not None else None
+        if compact_model is sklearn_model:
+            compact_model = None
+        self.registry.save(
+            self.model_name,
+            sklearn_model,
+            self.features,
+            {"mae": float(self.mae), "rmse": float(self.rmse), "r2": float(self.r2)},
+            fingerprint,
+            self._model_config(),
+            extra={
+                "incremental_updates": incremental_updates,
+                "metrics_history": self.metrics_history,
+                "compact": self.compact if compact_model is not None else None,
+            },
+            compact_model=compact_model,
+        )
+
     def train_model(self):
-        train_df = self.df[self.df[self.target].notna()]
+        """Pełny trening na całej historii (ocena na losowych 20% wierszy)."""
+        train_df = self._training_rows()
+        fingerprint = None
+        if self.registry is not None:
+            fingerprint = data_fingerprint(train_df, self._fingerprint_columns())
+            if self._load_from_registry(fingerprint):
+                return
+            previous = self.registry.load_metadata(self.model_name)
+            self.metrics_history = previous.get("metrics_history", []) if previous else []
         X_train = train_df[self.features]
         y_train = train_df[self.target]
         X_tr, X_te, y_tr, y_te = train_test_split(
             X_train, y_train, test_size=0.2, random_state=42
         )
-        self.model = RandomForestRegressor(n_estimators=100, random_state=42)
+        self.model = create_estimator(self.backend, self.model_params)
+        start = time.perf_counter()
         self.model.fit(X_tr, y_tr)
-        y_pred_test = self.model.predict(X_te)
-        self.mae = mean_absolute_error(y_te, y_pred_test)
-        self.rmse = np.sqrt(mean_squared_error(y_te, y_pred_test))
-        self.r2 = r2_score(y_te, y_pred_test)
-        print(f"{self.target}: MAE={self.mae:.2f}, RMSE={self.rmse:.2f}, R2={self.r2:.2f}")
+        fit_seconds = time.perf_counter() - start
+        self._set_metrics(y_te, self.model.predict(X_te))
+        self._record_metrics("full", fit_seconds, len(X_tr))
+        if self.registry is not None:
+            self._save_to_registry(fingerprint, incremental_updates=0)
+        self._compact_model()
+
+    def update_model(self, window_days=30, new_trees=10, max_trees=None, full_refit_every=7):
+        """
+        Trening przyrostowy lasu z rejestru: dokłada new_trees drzew uczonych na ostatnich
+        window_days dniach (warm_start) i usuwa najstarsze drzewa ponad max_trees
+        (domyślnie n_estimators backendu), więc koszt zależy od okna, a nie całej historii.
+        Metryki liczone są na nowych wierszach przed ich dołożeniem do modelu.
+
+        Pełny trening (train_model) wykonywany jest, gdy brak rejestru lub zapisanego modelu,
+        estymator nie jest lasem, zmieniły się dane sprzed ostatniego treningu
+        albo od ostatniego pełnego treningu minęło full_refit_every aktualizacji.
+        """
+        if self.registry is None:
+            return self.train_model()
+        train_df = self._training_rows()
+        columns = self._fingerprint_columns()
+        fingerprint = data_fingerprint(train_df, columns)
+        entry = self.registry.load_latest(self.model_name, self.features, self._model_config())
+        if entry is None:
+            return self.train_model()
+        model, meta = entry
+        if meta["fingerprint"] == fingerprint:
+            self._use_registry_entry(model, meta)
+            return
+        if not hasattr(model, "estimators_"):
+            print(f"{self.target}: backend {self.backend} nie obsługuje treningu przyrostowego")
+            return self.train_model()
+        if meta.get("incremental_updates", 0) >= full_refit_every:
+            print(f"{self.target}: {full_refit_every} aktualizacji przyrostowych - pełny trening")
+            return self.train_model()
+
+        # nowe wiersze to te po ostatniej parze (date, hour) poprzedniego treningu, jak
+        # watermark cache danych treningowych - późniejsze godziny dnia wczytanego częściowo
+        # nie są zmianą historii
+        dates = pd.to_datetime(train_df["date"])
+        trained_until = pd.Timestamp(meta["fingerprint"]["max_date"])
+        moments = dates
+        if "hour" in train_df.columns:
+            moments = dates + pd.to_timedelta(train_df["hour"], unit="h")
+            last_hour = meta["fingerprint"].get("max_hour")
+            trained_until += pd.Timedelta(hours=23 if last_hour is None else last_hour)
+        new_rows = train_df[moments > trained_until]
+        old_rows = train_df[moments <= trained_until]
+        if new_rows.empty or data_fingerprint(old_rows, columns) != meta["fingerprint"]:
+            print(f"{self.target}: zmienione dane historyczne - pełny trening")
+            return self.train_model()
+
+        self._set_metrics(new_rows[self.target], model.predict(new_rows[self.features]))
+        window = train_df[dates > dates.max() - pd.Timedelta(days=window_days)]
+        if max_trees is None:
+            max_trees = create_estimator(self.backend, self.model_params).n_estimators
+        start = time.perf_counter()
+        model.set_params(warm_start=True, n_estimators=len(model.estimators_) + new_trees)
+        model.fit(window[self.features], window[self.target])
+        model.estimators_ = model.estimators_[-max_trees:]
+        model.set_params(warm_start=False, n_estimators=len(model.estimators_))
+        fit_seconds = time.perf_counter() - start
+
+        self.model = model
+        self.metrics_history = meta.get("metrics_history", [])
+        self._record_metrics("incremental", fit_seconds, len(window))
+        self._save_to_registry(fingerprint, meta.get("incremental_updates", 0) + 1)
+
+    def backtest(self, start_date, end_date, **kwargs):
+        """
+        Backtest prognozy na kolejny dzień z rozszerzającym się oknem (backtesting.backtest)
+        dla bieżących danych, backendu i parametrów predyktora; kwargs trafiają do backtest.
+        """
+        if self.lags or self.rolling_windows:
+            raise ValueError(
+                "Backtest nie obsługuje cech opóźnionych - lag_1 pochodziłby z rzeczywistych danych dnia prognozy"
+            )
+        return backtest(
+            self.df,
+            self.features,
+            self.target,
+            start_date,
+            end_date,
+            backend=self.backend,
+            model_params=self.model_params,
+            **kwargs,
+        )
+
+    def tune(self, backends=("random_forest",), **kwargs):
+        """
+        Tuning parametrów na foldach czasowych (tuning.tune) dla bieżących danych.
+        Najlepsza konfiguracja trafia do rejestru, skąd predyktor bez podanego backendu
+        pobiera ją przy tworzeniu. Zwraca podsumowanie prób.
+        """
+        if self.lags or self.rolling_windows:
+            raise ValueError(
+                "Tuning nie obsługuje cech opóźnionych - lag_1 pochodziłby z rzeczywistych danych dnia prognozy"
+            )
+        summary = tune(self.df, self.features, self.target, backends, **kwargs)
+        best = summary.iloc[0]
+        if self.registry is not None:
+            self.registry.save_tuned_config(
+                self.model_name,
+                {
+                    "backend": best["backend"],
+                    "params": best["params"],
+                    "mae": float(best["mae"]),
+                    "rmse": float(best["rmse"]),
+                    "folds": int(best["folds"]),
+                    "tuned_at": pd.Timestamp.now(tz="UTC").isoformat(),
+                },
+            )
+        return summary
 
     def predict_missing(self):
-        predict_df = self.df[self.df[self.target].isna()]
+        missing = self.df[self.target].isna()
+        predict_df = self.df[missing]
         if len(predict_df) > 0:
-            X_pred = predict_df[self.features]
-            y_pred = self.model.predict(X_pred)
-            self.df.loc[self.df[self.target].isna(), self.target] = y_pred
+            if self.lags or self.rolling_windows:
+                y_pred, X_pred = recursive_forecast(
+                    self.model,
+                    self.history,
+                    predict_df,
+                    self.features,
+                    self.target,
+                    self.lags,
+                    self.rolling_windows,
+                    return_features=True,
+                )
+                X_pred = pd.DataFrame(X_pred, columns=self.features)
+            else:
+                X_pred = predict_df[self.features]
+                y_pred = self.model.predict(X_pred)
+            if self.quantiles:
+                self._predict_bands(X_pred, missing)
+            self.df.loc[missing, self.target] = y_pred
+
+    def _predict_bands(self, X_pred, missing):
+        """Przedziały prognozy z rozkładu prognoz drzew (jedna operacja na macierzy drzewa x wiersze)."""
+        if not hasattr(self.model, "estimators_") and not isinstance(self.model, CompactForest):
+            print(f"{self.target}: backend {self.backend} nie daje przedziałów prognozy")
+            return
+        bands = forest_quantiles(self.model, X_pred, self.quantiles)
+        for quantile, values in zip(self.quantiles, bands):
+            column = f"{self.target}_{band_name(quantile)}"
+            if column not in self.df.columns:
+                self.df[column] = np.nan
+            self.df.loc[missing, column] = values
 
     def save_predictions(self):
         self.df.to_excel(self.output_pred_path, index=False)
@@ -69,9 +345,13 @@ class BasePredictor:
         produced_pivot.to_excel(self.output_pivot_path, float_format="%.3f")
         print(f"Dane zapisane do {self.output_pivot_path}")
 
-    def return_pivot(self):
+    def return_pivot(self, band=None):
+        """Pivot godzina x dzień w MWh; band (np. "p10") zwraca pivot danego przedziału prognozy."""
+        value = self.pivot_value if band is None else f"{self.pivot_value}_{band}"
+        if value not in self.df.columns:
+            return pd.DataFrame()
         produced_pivot = self.df.pivot_table(
-            index="hour", columns="date", values=self.pivot_value, aggfunc="sum"
+            index="hour", columns="date", values=value, aggfunc="sum"
         )
         if produced_pivot.empty or produced_pivot.shape[1] == 0:
             return pd.DataFrame()
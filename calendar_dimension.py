@@ -0,0 +1,66 @@
+import holidays
+import numpy as np
+import pandas as pd
+
+from timezones import TIMEZONE
+
+CALENDAR_FEATURES = ("month", "day_of_week", "is_holiday", "is_dst")
+
+
+class CalendarDimension:
+    """
+    Wymiar kalendarza dla pełnych lat [start_year, end_year]: month, day_of_week
+    (0=poniedziałek), is_holiday (święto w Polsce lub niedziela) i is_dst (czas letni
+    w Europe/Warsaw w południe danego dnia). Każda cecha to tablica int8 indeksowana
+    numerem dnia liczonym od pierwszego dnia wymiaru, więc odczyt to jedno indeksowanie.
+    """
+
+    def __init__(self, start_year, end_year):
+        self.start_year = start_year
+        self.end_year = end_year
+        days = pd.date_range(f"{start_year}-01-01", f"{end_year}-12-31", freq="D")
+        self.first_day = days[0].to_datetime64().astype("datetime64[D]")
+        holiday_dates = pd.to_datetime(
+            list(holidays.Poland(years=range(start_year, end_year + 1)))
+        )
+        # przesunięcie względem UTC w południe; czas letni to przesunięcie większe od zimowego
+        noon = days + pd.Timedelta(hours=12)
+        utc_offset = noon - noon.tz_localize(TIMEZONE).tz_convert("UTC").tz_localize(None)
+        self.columns = {
+            "month": days.month.to_numpy(dtype=np.int8),
+            "day_of_week": days.weekday.to_numpy(dtype=np.int8),
+            "is_holiday": (days.isin(holiday_dates) | (days.weekday == 6)).astype(np.int8),
+            "is_dst": (utc_offset > utc_offset.min()).astype(np.int8),
+        }
+
+    def covers(self, start_year, end_year):
+        return self.start_year <= start_year and end_year <= self.end_year
+
+    def lookup(self, day_numbers, names=CALENDAR_FEATURES):
+        """day_numbers: tablica datetime64[D]; zwraca słownik nazwa -> tablica int8."""
+        index = (day_numbers - self.first_day).astype(np.int64)
+        return {name: self.columns[name][index] for name in names}
+
+
+_calendar = None
+
+
+def get_calendar(start_year, end_year):
+    """Wymiar kalendarza procesu, rozszerzany (budowany od nowa) tylko dla nowych lat."""
+    global _calendar
+    if _calendar is None or not _calendar.covers(start_year, end_year):
+        if _calendar is not None:
+            start_year = min(start_year, _calendar.start_year)
+            end_year = max(end_year, _calendar.end_year)
+        _calendar = CalendarDimension(start_year, end_year)
+    return _calendar
+
+
+def calendar_features(dates, names=CALENDAR_FEATURES):
+    """Zwraca słownik nazwa -> tablica int8 cech kalendarzowych dla podanych dat."""
+    day_numbers = pd.to_datetime(dates).to_numpy().astype("datetime64[D]")
+    if len(day_numbers) == 0:
+        return {name: np.zeros(0, dtype=np.int8) for name in names}
+    years = day_numbers.astype("datetime64[Y]").astype(np.int64) + 1970
+    calendar = get_calendar(int(years.min()), int(years.max()))
+    return calendar.lookup(day_numbers, names)
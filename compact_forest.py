@@ -0,0 +1,165 @@
+import numpy as np
+
+# liczba wierszy przechodzących przez drzewa naraz (ogranicza macierz węzłów n_trees x wiersze)
+PREDICT_CHUNK_ROWS = 4096
+
+
+def _prune_tree(tree, max_depth=None, min_samples_leaf=None):
+    """
+    Zwraca indeksy węzłów drzewa sklearn, które zostają po przycięciu, oraz maskę węzłów
+    końcowych (liście i węzły zamienione w liście). Węzły na głębokości max_depth oraz węzły,
+    których dziecko ma mniej niż min_samples_leaf próbek, stają się liśćmi - ich wartość
+    to średnia z próbek węzła, którą sklearn przechowuje także dla węzłów wewnętrznych.
+    """
+    left, right = tree.children_left, tree.children_right
+    terminal = left == -1
+    if min_samples_leaf:
+        samples = tree.n_node_samples
+        inner = ~terminal
+        small = np.zeros_like(terminal)
+        small[inner] = (samples[left[inner]] < min_samples_leaf) | (
+            samples[right[inner]] < min_samples_leaf
+        )
+        terminal = terminal | small
+
+    kept = []
+    frontier = np.array([0])
+    depth = 0
+    while len(frontier):
+        kept.append(frontier)
+        if max_depth is not None and depth >= max_depth:
+            terminal[frontier] = True
+            break
+        inner = frontier[~terminal[frontier]]
+        frontier = np.concatenate([left[inner], right[inner]])
+        depth += 1
+    kept = np.sort(np.concatenate(kept))
+    return kept, terminal, depth
+
+
+class CompactForest:
+    """
+    Las drzew regresyjnych w płaskich tablicach NumPy (wszystkie drzewa jeden po drugim):
+    cecha, próg, dzieci i wartość każdego węzła. Liście wskazują same na
+    siebie z progiem +inf, więc predykcja to stała liczba kroków (głębokość lasu) wykonywanych
+    naraz dla wszystkich drzew i wierszy.
+
+    Progi zapisywane są w float32 zaokrąglonym w dół - sklearn porównuje cechy rzutowane
+    na float32 z progiem float64, a x32 <= próg ⟺ x32 <= float32 w dół(próg), więc ścieżki
+    w drzewach są identyczne. Wartości liści domyślnie w float32 (błąd rzędu 1e-7 względnie).
+    """
+
+    def __init__(self, feature, threshold, children, value, missing_left, roots, depth, feature_names=None):
+        self.feature = feature
+        self.threshold = threshold
+        # children: [lewe, prawe] dziecko węzła i pod indeksami 2i, 2i + 1
+        self.children = children
+        self.value = value
+        self.missing_left = missing_left
+        self.roots = roots
+        self.depth = int(depth)
+        self.feature_names = None if feature_names is None else list(feature_names)
+
+    @classmethod
+    def from_sklearn(cls, forest, max_depth=None, min_samples_leaf=None, value_dtype=np.float32):
+        """Eksport wytrenowanego lasu (RandomForestRegressor) z opcjonalnym przycięciem drzew."""
+        parts = {name: [] for name in ("feature", "threshold", "children", "value", "missing_left")}
+        roots = []
+        depth = 0
+        offset = 0
+        for estimator in forest.estimators_:
+            tree = estimator.tree_
+            kept, terminal, tree_depth = _prune_tree(tree, max_depth, min_samples_leaf)
+            depth = max(depth, tree_depth)
+            new_index = np.full(tree.node_count, -1, dtype=np.int64)
+            new_index[kept] = np.arange(len(kept)) + offset
+            is_terminal = terminal[kept]
+            own = new_index[kept]
+
+            threshold = tree.threshold[kept].astype(np.float32)
+            rounded_up = threshold.astype(np.float64) > tree.threshold[kept]
+            threshold[rounded_up] = np.nextafter(threshold[rounded_up], np.float32(-np.inf))
+            threshold[is_terminal] = np.inf
+            missing = getattr(tree, "missing_go_to_left", None)
+
+            parts["feature"].append(np.where(is_terminal, 0, tree.feature[kept]))
+            parts["threshold"].append(threshold)
+            left = np.where(is_terminal, own, new_index[tree.children_left[kept]])
+            right = np.where(is_terminal, own, new_index[tree.children_right[kept]])
+            parts["children"].append(np.column_stack([left, right]).ravel())
+            parts["value"].append(tree.value[kept, 0, 0])
+            parts["missing_left"].append(
+                np.zeros(len(kept), dtype=bool) if missing is None else missing[kept].astype(bool)
+            )
+            roots.append(offset)
+            offset += len(kept)
+
+        n_features = forest.n_features_in_
+        return cls(
+            feature=np.concatenate(parts["feature"]).astype(np.int16 if n_features < 2**15 else np.int32),
+            threshold=np.concatenate(parts["threshold"]),
+            children=np.concatenate(parts["children"]).astype(np.int32),
+            value=np.concatenate(parts["value"]).astype(value_dtype),
+            missing_left=np.concatenate(parts["missing_left"]),
+            roots=np.array(roots, dtype=np.int32),
+            depth=depth,
+            feature_names=getattr(forest, "feature_names_in_", None),
+        )
+
+    @property
+    def n_trees(self):
+        return len(self.roots)
+
+    @property
+    def nbytes(self):
+        return sum(
+            array.nbytes
+            for array in (self.feature, self.threshold, self.children, self.value, self.missing_left, self.roots)
+        )
+
+    def _as_array(self, X):
+        if self.feature_names is not None and hasattr(X, "columns"):
+            X = X[self.feature_names]
+        return np.asarray(X, dtype=np.float32)
+
+    def per_tree_predict(self, X):
+        """Prognozy każdego drzewa jako macierz (n_trees x n_rows)."""
+        X = self._as_array(X)
+        result = np.empty((self.n_trees, len(X)))
+        has_missing = np.isnan(X).any()
+        for start in range(0, len(X), PREDICT_CHUNK_ROWS):
+            chunk = X[start : start + PREDICT_CHUNK_ROWS]
+            rows = np.arange(len(chunk))
+            nodes = np.repeat(self.roots[:, None], len(chunk), axis=1)
+            for _ in range(self.depth):
+                x = chunk[rows, self.feature[nodes]]
+                go_right = ~(x <= self.threshold[nodes])
+                if has_missing:
+                    go_right &= ~(np.isnan(x) & self.missing_left[nodes])
+                nodes = self.children[2 * nodes + go_right]
+            result[:, start : start + len(chunk)] = self.value[nodes]
+        return result
+
+    def predict(self, X):
+        return self.per_tree_predict(X).mean(axis=0)
+
+    def save(self, path):
+        np.savez(
+            path,
+            feature=self.feature,
+            threshold=self.threshold,
+            children=self.children,
+            value=self.value,
+            missing_left=self.missing_left,
+            roots=self.roots,
+            depth=np.array(self.depth),
+            feature_names=np.array(self.feature_names or [], dtype=str),
+        )
+
+    @classmethod
+    def load(cls, path):
+        with np.load(path) as data:
+            arrays = {name: data[name] for name in data.files}
+        feature_names = arrays.pop("feature_names").tolist() or None
+        depth = int(arrays.pop("depth"))
+        return cls(depth=depth, feature_names=feature_names, **arrays)
@@ -1,40 +1,238 @@
+import io
+import json
 import pandas as pd
 import logging
 import datetime
-import holidays
+from itertools import islice, product
+import schema
 import sql_queries
 import pandas as pd
-from sqlalchemy import Table, MetaData
+from sqlalchemy import Integer, Table, MetaData
 from sqlalchemy import create_engine, text
 from sqlalchemy.dialects.postgresql import insert
+from openpyxl import load_workbook
 import numpy as np
+from import_checkpoint import DEFAULT_CHECKPOINT_FILE, ImportCheckpoint
+from training_data_cache import TrainingDataCache
+from feature_store import (
+    MODES,
+    PRODUCED_ENERGY_FEATURES,
+    SOLD_ENERGY_FEATURES,
+    add_derived_features,
+)
+
+# PostgreSQL przyjmuje maksymalnie 65535 parametrów w jednym zapytaniu
+MAX_BIND_PARAMS = 65535
+# Liczba wierszy przesyłanych jednym poleceniem COPY przy imporcie
+COPY_CHUNK_ROWS = 100_000
+ENERGY_UNIQUE_COLS = ["date", "hour", "type", "object_id"]
 
 
 class DBManager:
 
-    def __init__(self, db_url):
+    def __init__(self, db_url, cache_dir=None):
+        """
+        cache_dir: katalog lokalnego cache danych treningowych (Parquet);
+        None oznacza, że dane treningowe są zawsze pobierane w całości z bazy.
+        """
         self.engine = create_engine(db_url)
         self.logger = logging.getLogger(__name__)
+        self._metadata = MetaData()
+        self._tables = {}
+        self.training_cache = TrainingDataCache(cache_dir) if cache_dir else None
+        self._partitioned = None
+        self._known_partitions = set()
+
+    def ensure_schema(self, partitioned=False):
+        """
+        Tworzy brakujące tabele i indeksy, wykonując kolejne migracje z modułu schema.
+        Każda migracja działa w osobnej transakcji pod blokadą doradczą, więc kilka
+        procesów może wywołać tę metodę równocześnie. Zwraca bieżącą wersję schematu.
+        partitioned=True: tabele tworzone są jako partycjonowane (type, a w nim miesiące
+        po date); układ wybierany jest tylko przy tworzeniu tabel w pustej bazie.
+        """
+        layout = "partitioned" if partitioned else "plain"
+        with self.engine.begin() as conn:
+            conn.execute(text(schema.CREATE_SCHEMA_MIGRATIONS))
+        for version, description, statements in schema.MIGRATIONS:
+            with self.engine.begin() as conn:
+                conn.execute(text(schema.LOCK_SCHEMA_MIGRATIONS))
+                applied = conn.execute(
+                    text(schema.IS_MIGRATION_APPLIED), {"version": version}
+                ).scalar()
+                if applied:
+                    continue
+                for statement in schema.migration_statements(statements, layout):
+                    conn.execute(text(statement))
+                conn.execute(
+                    text(schema.RECORD_MIGRATION),
+                    {"version": version, "description": description},
+                )
+            self.logger.info(f"Wykonano migrację {version}: {description}.")
+        # struktura tabel mogła się zmienić - odczytaj je ponownie przy następnym użyciu
+        self._metadata = MetaData()
+        self._tables = {}
+        self._partitioned = None
+        with self.engine.connect() as conn:
+            return conn.execute(text(schema.GET_SCHEMA_VERSION)).scalar()
+
+    def is_partitioned(self):
+        """Sprawdza (raz na DBManager), czy baza używa układu partycjonowanego."""
+        if self._partitioned is None:
+            with self.engine.connect() as conn:
+                self._partitioned = conn.execute(
+                    text(schema.IS_PARTITIONED_LAYOUT)
+                ).scalar()
+        return self._partitioned
+
+    def ensure_partitions(self, start_date, end_date):
+        """
+        Tworzy brakujące partycje miesięczne od start_date do end_date (włącznie)
+        dla danych rzeczywistych i prognoz we wszystkich tabelach potoku.
+        """
+        if not self.is_partitioned():
+            return
+        months = pd.period_range(start_date, end_date, freq="M")
+        missing = [
+            (f"{table}_{type_value}", month)
+            for table in schema.PIPELINE_TABLES
+            for type_value in schema.PARTITIONED_TYPES
+            for month in months
+            if (f"{table}_{type_value}", month) not in self._known_partitions
+        ]
+        if not missing:
+            return
+        with self.engine.begin() as conn:
+            # CREATE TABLE IF NOT EXISTS ... PARTITION OF nie jest bezpieczne przy równoległym
+            # wykonaniu (DuplicateTable) - procesy tworzą partycje kolejno pod blokadą migracji
+            conn.execute(text(schema.LOCK_SCHEMA_MIGRATIONS))
+            for parent, month in missing:
+                month_start = month.start_time.date()
+                conn.execute(
+                    text(
+                        schema.CREATE_MONTH_PARTITION.format(
+                            partition=schema.month_partition_name(parent, month_start),
+                            parent=parent,
+                            start=month_start,
+                            end=(month + 1).start_time.date(),
+                        )
+                    )
+                )
+        self._known_partitions.update(missing)
+
+    def _ensure_partitions_for(self, df):
+        if df.empty or not self.is_partitioned():
+            return
+        dates = pd.to_datetime(df["date"])
+        self.ensure_partitions(dates.min(), dates.max())
 
-    def get_latest_energy_production_date(self, type_value="real"):
+    def drop_predicted_partitions(self, before_date):
+        """
+        Usuwa stare prognozy przez odłączenie i usunięcie całych partycji miesięcznych
+        (zamiast masowego DELETE). Usuwane są miesiące kończące się przed before_date.
+        Zwraca listę usuniętych partycji.
+        """
+        if not self.is_partitioned():
+            raise RuntimeError("drop_predicted_partitions wymaga układu partycjonowanego.")
+        before_month = pd.Period(before_date, freq="M")
+        dropped = []
+        with self.engine.begin() as conn:
+            conn.execute(text(schema.LOCK_SCHEMA_MIGRATIONS))
+            for table in schema.PIPELINE_TABLES:
+                parent = f"{table}_predicted"
+                partitions = conn.execute(
+                    text(schema.GET_CHILD_PARTITIONS), {"parent": parent}
+                ).scalars()
+                for partition in sorted(partitions):
+                    month = pd.Period(
+                        partition[len(parent) + 1 :].replace("_", "-"), freq="M"
+                    )
+                    if month >= before_month:
+                        continue
+                    conn.execute(
+                        text(
+                            schema.DETACH_PARTITION.format(
+                                parent=parent, partition=partition
+                            )
+                        )
+                    )
+                    conn.execute(
+                        text(schema.DROP_PARTITION.format(partition=partition))
+                    )
+                    self._known_partitions.discard((parent, month))
+                    dropped.append(partition)
+        self.logger.info(
+            f"Usunięto {len(dropped)} partycji prognoz sprzed {before_month}: {dropped}"
+        )
+        return dropped
+
+    def explain_query(self, query, params=None, force_index=False):
+        """
+        Zwraca plan zapytania (EXPLAIN FORMAT JSON) jako listę (typ węzła, tabela, indeks).
+        force_index=True wyłącza skany sekwencyjne, co pozwala sprawdzić, czy indeksy
+        w ogóle mogą obsłużyć zapytanie (na małych tabelach planista i tak woli Seq Scan).
+        """
+        with self.engine.begin() as conn:
+            if force_index:
+                conn.execute(text("SET LOCAL enable_seqscan = off"))
+            plan = conn.execute(
+                text(f"EXPLAIN (FORMAT JSON) {query}"), params or {}
+            ).scalar()
+        if isinstance(plan, str):
+            plan = json.loads(plan)
+        return schema.collect_plan_scans(plan[0]["Plan"])
+
+    def check_query_plans(self, object_id=1, force_index=True):
+        """
+        Sprawdza przez EXPLAIN, czy zapytania treningowe i predykcyjne korzystają z indeksów.
+        Zwraca słownik: nazwa zapytania -> {"indexes": [...], "seq_scans": [...]}.
+        """
+        feature_sets = {
+            "produced": PRODUCED_ENERGY_FEATURES,
+            "sold": SOLD_ENERGY_FEATURES,
+        }
+        report = {}
+        for (prefix, feature_set), mode in product(feature_sets.items(), MODES):
+            name = f"{prefix}_{mode}"
+            scans = self.explain_query(
+                feature_set.query(mode), feature_set.params(mode, object_id), force_index
+            )
+            report[name] = {
+                "indexes": sorted({index for _, _, index in scans if index}),
+                "seq_scans": sorted(
+                    {
+                        table
+                        for node, table, _ in scans
+                        if node == "Seq Scan" and table in schema.PIPELINE_TABLES
+                    }
+                ),
+            }
+        return report
+
+    def get_latest_energy_production_date(self, type_value="real", object_id=1):
         query = text(sql_queries.GET_LATEST_ENERGY_PRODUCTION_DATE)
         with self.engine.connect() as conn:
-            result = conn.execute(query, {"type_value": type_value}).fetchone()
+            result = conn.execute(
+                query, {"type_value": type_value, "object_id": object_id}
+            ).fetchone()
         return result[0] if result else None
 
-    def get_latest_weather_date(self, type_value="real"):
+    def get_latest_weather_date(self, type_value="real", object_id=1):
         query = text(sql_queries.GET_LATEST_WEATHER_DATE)
         with self.engine.connect() as conn:
-            result = conn.execute(query, {"type_value": type_value}).fetchone()
+            result = conn.execute(
+                query, {"type_value": type_value, "object_id": object_id}
+            ).fetchone()
         return result[0] if result else None
 
-    def is_weather_day_complete(self, last_date=None, type_value="real"):
+    def is_weather_day_complete(self, last_date=None, type_value="real", object_id=1):
         if not last_date:
             return False
         query = text(sql_queries.IS_WEATHER_DAY_COMPLETE)
         with self.engine.connect() as conn:
             result = conn.execute(
-                query, {"date": last_date, "type_value": type_value}
+                query,
+                {"date": last_date, "type_value": type_value, "object_id": object_id},
             ).fetchone()
         return result[0] == 24
 
@@ -49,10 +247,52 @@ class DBManager:
 
     def _read_and_prepare_excel_data(self, excel_path):
         df = pd.read_excel(excel_path)
+        return self._prepare_excel_chunk(df)
+
+    def _prepare_excel_chunk(self, df):
         df.columns = df.columns.str.strip()
         df["date"] = pd.to_datetime(df["date"], dayfirst=True).dt.date
         return df
 
+    def _iter_excel_chunks(self, excel_path, chunksize, skip_rows=0):
+        """
+        Czyta pierwszy arkusz pliku Excel wiersz po wierszu (openpyxl w trybie read-only)
+        i zwraca kolejne paczki jako DataFrame, pomijając skip_rows wierszy danych.
+        """
+        workbook = load_workbook(excel_path, read_only=True, data_only=True)
+        try:
+            rows = workbook.worksheets[0].iter_rows(values_only=True)
+            header = [str(col) for col in next(rows)]
+            rows = islice(rows, skip_rows, None)
+            while True:
+                batch = list(islice(rows, chunksize))
+                if not batch:
+                    break
+                yield pd.DataFrame(batch, columns=header)
+        finally:
+            workbook.close()
+
+    def _run_chunked_import(self, chunks, checkpoint, import_chunk):
+        """
+        Importuje kolejne paczki funkcją import_chunk, zapisując postęp po każdej paczce.
+        Po udanym imporcie checkpoint jest usuwany. Zwraca liczbę zapisanych rekordów.
+        """
+        rows_done = checkpoint.rows_done
+        if rows_done:
+            self.logger.info(
+                f"Wznawianie importu {checkpoint.source_path} od wiersza {rows_done}."
+            )
+        saved = 0
+        for chunk in chunks:
+            saved += import_chunk(chunk)
+            rows_done += len(chunk)
+            checkpoint.save(rows_done)
+            self.logger.info(
+                f"{checkpoint.source_path}: przetworzono {rows_done} wierszy, zapisano {saved} rekordów."
+            )
+        checkpoint.clear()
+        return saved
+
     def _filter_new_data(self, df, latest_date):
         if latest_date:
             return df[df["date"] > latest_date]
@@ -74,85 +314,342 @@ class DBManager:
             .assign(type=type_value, object_id=object_id)
         )
 
-    def _insert_ignore_duplicates(self, table_name, data_df, unique_cols):
+    def _get_table(self, table_name):
+        """Zwraca obiekt Table; schemat jest odczytywany z bazy tylko przy pierwszym użyciu."""
+        if table_name not in self._tables:
+            self._tables[table_name] = Table(
+                table_name, self._metadata, autoload_with=self.engine
+            )
+        return self._tables[table_name]
+
+    def _insert_ignore_duplicates(
+        self, table_name, data_df, unique_cols, chunk_size=None, method="copy"
+    ):
+        """
+        Wstawia dane z pominięciem duplikatów (ON CONFLICT DO NOTHING) paczkami,
+        dzięki czemu zużycie pamięci nie rośnie z rozmiarem importu.
+        method="copy": paczki COPY do tabeli tymczasowej i INSERT ... SELECT,
+        method="values": wielowierszowe INSERT ... VALUES o rozmiarze wynikającym
+        z limitu parametrów PostgreSQL.
+        Zwraca liczbę faktycznie wstawionych rekordów.
+        """
         if data_df.empty:
+            return 0
+        if method not in ("copy", "values"):
+            raise ValueError("method must be 'copy' or 'values'")
+        self._ensure_partitions_for(data_df)
+        table = self._get_table(table_name)
+        if method == "copy":
+            inserted = self._insert_ignore_duplicates_copy(
+                table, data_df, unique_cols, chunk_size or COPY_CHUNK_ROWS
+            )
+            self._record_data_changes(table_name, data_df)
+            return inserted
+        if chunk_size is None:
+            chunk_size = MAX_BIND_PARAMS // len(data_df.columns)
+        inserted = 0
+        with self.engine.begin() as conn:
+            for start in range(0, len(data_df), chunk_size):
+                chunk = data_df.iloc[start : start + chunk_size]
+                # NaN trafia do bazy jako NULL, a nie jako wartość 'NaN'
+                records = chunk.astype(object).where(chunk.notna(), None)
+                stmt = (
+                    insert(table)
+                    .values(records.to_dict(orient="records"))
+                    .on_conflict_do_nothing(index_elements=unique_cols)
+                )
+                inserted += conn.execute(stmt).rowcount
+        self._record_data_changes(table_name, data_df)
+        return inserted
+
+    def _record_data_changes(self, table_name, df):
+        """
+        Odnotowuje w data_changes najwcześniejszą zapisaną datę rekordów rzeczywistych
+        każdego obiektu z df. Wywoływane po zatwierdzeniu zapisu, więc odczyt danych
+        treningowych, który widzi wpis dziennika, widzi też zapisane rekordy.
+        """
+        real = df[df["type"] == "real"]
+        if real.empty:
             return
-        meta = MetaData()
-        table = Table(table_name, meta, autoload_with=self.engine)
-        stmt = (
-            insert(table)
-            .values(data_df.to_dict(orient="records"))
-            .on_conflict_do_nothing(index_elements=unique_cols)
-        )
+        min_dates = real.groupby("object_id")["date"].min()
         with self.engine.begin() as conn:
-            conn.execute(stmt)
+            conn.execute(
+                text(sql_queries.RECORD_DATA_CHANGE),
+                [
+                    {
+                        "table_name": table_name,
+                        "object_id": int(object_id),
+                        "min_date": pd.Timestamp(min_date).date(),
+                    }
+                    for object_id, min_date in min_dates.items()
+                ],
+            )
 
-    def import_data_from_excel(self, excel_path, object_id, type_value="real"):
+    def _insert_ignore_duplicates_copy(self, table, data_df, unique_cols, chunk_size):
+        columns = list(data_df.columns)
+        # kolumny całkowite (np. hour z NaN w Excelu) muszą trafić do CSV bez części ułamkowej
+        integer_cols = [
+            col for col in columns if isinstance(table.c[col].type, Integer)
+        ]
+        params = {
+            "table": table.name,
+            "columns": ", ".join(columns),
+            "unique_columns": ", ".join(unique_cols),
+        }
+        inserted = 0
+        with self.engine.begin() as conn:
+            conn.execute(text(sql_queries.CREATE_IMPORT_STAGING.format(**params)))
+            for start in range(0, len(data_df), chunk_size):
+                chunk = data_df.iloc[start : start + chunk_size]
+                if integer_cols:
+                    chunk = chunk.astype({col: "Int64" for col in integer_cols})
+                self._copy_dataframe(conn, f"{table.name}_import", chunk, columns)
+                result = conn.execute(
+                    text(sql_queries.INSERT_IGNORE_FROM_IMPORT_STAGING.format(**params))
+                )
+                inserted += result.rowcount
+                conn.execute(text(sql_queries.TRUNCATE_IMPORT_STAGING.format(**params)))
+        return inserted
+
+    def import_data_from_excel(
+        self,
+        excel_path,
+        object_id,
+        type_value="real",
+        chunksize=None,
+        checkpoint_path=DEFAULT_CHECKPOINT_FILE,
+    ):
         """
         Importuje dane z pliku Excel do tabel produced_energy i sold_energy.
         Pomija duplikaty na podstawie (date, hour, type, object_id).
+        chunksize: jeśli podany, arkusz czytany jest wiersz po wierszu i importowany
+        paczkami, a postęp zapisywany jest w checkpoint_path (import można wznowić).
         """
+        if chunksize:
+            return self._import_excel_in_chunks(
+                excel_path, object_id, type_value, chunksize, checkpoint_path
+            )
         df = self._read_and_prepare_excel_data(excel_path)
-        latest_date = self.get_latest_energy_production_date(type_value=type_value)
+        latest_date = self.get_latest_energy_production_date(
+            type_value=type_value, object_id=object_id
+        )
         self.logger.info(f"Ostatnia data w bazie dla {type_value}: {latest_date}")
 
         df = self._filter_new_data(df, latest_date)
         pv_df = self._prepare_produced_energy_df(df, object_id, type_value)
         sold_df = self._prepare_sold_energy_df(df, object_id, type_value)
-        self._insert_ignore_duplicates(
-            "produced_energy", pv_df, ["date", "hour", "type", "object_id"]
+        self._insert_ignore_duplicates("produced_energy", pv_df, ENERGY_UNIQUE_COLS)
+        self._insert_ignore_duplicates("sold_energy", sold_df, ENERGY_UNIQUE_COLS)
+        self.logger.info(
+            f"Import danych historycznych z pliku excel.\nWstawiono {len(pv_df)} do produced_energy i {len(sold_df)} do sold_energy (duplikaty pominięte)"
         )
-        self._insert_ignore_duplicates(
-            "sold_energy", sold_df, ["date", "hour", "type", "object_id"]
+
+    def _import_excel_in_chunks(
+        self, excel_path, object_id, type_value, chunksize, checkpoint_path
+    ):
+        checkpoint = ImportCheckpoint(
+            excel_path, f"excel:{type_value}:{object_id}", checkpoint_path
+        )
+        # data odcięcia ustalana jest raz na początku importu - po wznowieniu nie może
+        # się zmienić, inaczej pominięta zostałaby reszta częściowo zaimportowanego dnia
+        if "latest_date" not in checkpoint.state:
+            latest_date = self.get_latest_energy_production_date(
+                type_value=type_value, object_id=object_id
+            )
+            checkpoint.state["latest_date"] = (
+                latest_date.isoformat() if latest_date else None
+            )
+        latest_date = checkpoint.state["latest_date"]
+        if latest_date:
+            latest_date = datetime.date.fromisoformat(latest_date)
+        self.logger.info(f"Ostatnia data w bazie dla {type_value}: {latest_date}")
+
+        def import_chunk(chunk):
+            # openpyxl w trybie read-only zwraca też puste wiersze z końca arkusza
+            # (np. sformatowane komórki), których pd.read_excel nie wczytuje
+            chunk = chunk.dropna(how="all")
+            chunk = self._filter_new_data(self._prepare_excel_chunk(chunk), latest_date)
+            pv_df = self._prepare_produced_energy_df(chunk, object_id, type_value)
+            sold_df = self._prepare_sold_energy_df(chunk, object_id, type_value)
+            return self._insert_ignore_duplicates(
+                "produced_energy", pv_df, ENERGY_UNIQUE_COLS
+            ) + self._insert_ignore_duplicates("sold_energy", sold_df, ENERGY_UNIQUE_COLS)
+
+        chunks = self._iter_excel_chunks(excel_path, chunksize, checkpoint.rows_done)
+        return self._run_chunked_import(chunks, checkpoint, import_chunk)
+
+    def get_feature_data(self, feature_set, object_id=1, mode="training"):
+        """
+        Zwraca dane dla zestawu cech (feature_store.FeatureSet) w trybie "training"
+        (rekordy rzeczywiste ze znanym celem) lub "prediction" (puste rekordy prognozy)
+        z wyliczonymi cechami kalendarzowymi. Dane treningowe korzystają z cache, jeśli włączony.
+        """
+        if mode == "training" and self.training_cache is not None:
+            return self._get_cached_training_data(feature_set, object_id)
+        df = pd.read_sql(
+            text(feature_set.query(mode)),
+            self.engine,
+            params=feature_set.params(mode, object_id),
         )
+        return add_derived_features(df, feature_set)
+
+    def _get_data_changes(self, feature_set, object_id, since):
+        """
+        Zwraca (znacznik następnego odczytu, najwcześniejsza data zmieniona w tabelach
+        zestawu cech dla obiektu przez transakcje od znacznika since albo None).
+        """
+        with self.engine.connect() as conn:
+            row = conn.execute(
+                text(sql_queries.GET_DATA_CHANGES_SINCE),
+                {
+                    "object_id": object_id,
+                    "target_table": feature_set.target_table,
+                    "source_table": feature_set.source_table,
+                    "since": since,
+                },
+            ).one()
+        return row.marker, row.min_date
+
+    def _get_cached_training_data(self, feature_set, object_id):
+        """
+        Z bazy pobierane są tylko rekordy nowsze niż zapisany watermark (date, hour),
+        a cechy wyliczane są jedynie dla nich i dopisywane do danych z cache.
+        Jeśli od ostatniego odczytu zapisano rekordy (cel lub cechy) z datą nie późniejszą
+        niż watermark (dziennik data_changes), rekordy cache od tej daty są odrzucane,
+        a watermark cofany, więc późno dołączone i poprawione rekordy trafiają do cache.
+        Cache o innych kolumnach niż bieżący zestaw cech jest budowany od nowa.
+        """
+        table_name = feature_set.target_table
+        params = feature_set.params("training", object_id)
+        cached_df, watermark, change_marker = self.training_cache.load(table_name, object_id)
+        # dziennik odczytywany przed danymi: zmiana zapisana w trakcie odczytu
+        # zostanie uwzględniona przy następnym wywołaniu
+        change_marker, changed_from = self._get_data_changes(
+            feature_set, object_id, change_marker
+        )
+        rewound = False
+        if cached_df is not None and changed_from is not None and changed_from <= watermark[0]:
+            cached_df = cached_df[pd.to_datetime(cached_df["date"]).dt.date < changed_from]
+            watermark = (changed_from - datetime.timedelta(days=1), 23)
+            rewound = True
+            self.logger.info(
+                f"Cache {table_name} (obiekt {object_id}): zmiany od {changed_from}, cofnięto watermark."
+            )
+            if cached_df.empty:
+                cached_df = None
+        if cached_df is None:
+            new_df = pd.read_sql(text(feature_set.query("training")), self.engine, params=params)
+        else:
+            new_df = pd.read_sql(
+                text(feature_set.query("training", since=True)),
+                self.engine,
+                params={**params, "last_date": watermark[0], "last_hour": watermark[1]},
+            )
         self.logger.info(
-            f"Import danych historycznych z pliku excel.\nWstawiono {len(pv_df)} do produced_energy i {len(sold_df)} do sold_energy (duplikaty pominięte)"
+            f"Cache {table_name} (obiekt {object_id}): watermark {watermark}, nowych rekordów {len(new_df)}."
+        )
+        new_df = add_derived_features(new_df, feature_set)
+        if cached_df is not None and list(cached_df.columns) != list(new_df.columns):
+            self.logger.info(f"Cache {table_name} (obiekt {object_id}): zmienione kolumny, przebudowa.")
+            self.training_cache.invalidate(table_name, object_id)
+            return self._get_cached_training_data(feature_set, object_id)
+        if new_df.empty and cached_df is not None and not rewound:
+            return cached_df
+        df = (
+            new_df
+            if cached_df is None
+            else pd.concat([cached_df, new_df], ignore_index=True)
         )
+        if df.empty:
+            self.training_cache.invalidate(table_name, object_id)
+            return df
+        self.training_cache.save(table_name, object_id, df, change_marker)
+        return df
 
-    def get_produced_energy_training_data(self):
+    def get_produced_energy_training_data(self, object_id=1):
         """
         Zwraca DataFrame z danymi do nauki modelu (łącząc dane pogodowe i produkcję).
         """
-        query = text(sql_queries.GET_PRODUCED_ENERGY_TRAINING_DATA)
-        df = pd.read_sql(query, self.engine)
-        df["date"] = pd.to_datetime(df["date"])
-        df["month"] = df["date"].dt.month
-        df["date"] = df["date"].dt.date
-        return df
+        return self.get_feature_data(PRODUCED_ENERGY_FEATURES, object_id, "training")
 
-    def get_sold_energy_training_data(self):
+    def get_sold_energy_training_data(self, object_id=1):
         """
         Zwraca DataFrame z danymi do nauki modelu dla energii oddanej (sold_energy),
         wyliczając cechy month, day_of_week, is_holiday.
         """
-        query = text(sql_queries.GET_SOLD_ENERGY_TRAINING_DATA)
-        df = pd.read_sql(query, self.engine)
-        df["date"] = pd.to_datetime(df["date"])
-        df["month"] = df["date"].dt.month
-        df["day_of_week"] = df["date"].dt.weekday  # 0=poniedziałek, 6=niedziela
+        return self.get_feature_data(SOLD_ENERGY_FEATURES, object_id, "training")
 
-        pl_holidays = holidays.Poland(years=df["date"].dt.year.unique())
-        self.logger.info(
-            f"Znaleziono {len(pl_holidays)} świąt w latach: {df['date'].dt.year.unique()}"
+    def _copy_dataframe(self, conn, table_name, df, columns):
+        """
+        Strumieniuje kolumny DataFrame do tabeli poleceniem COPY ... FROM STDIN (format CSV).
+        Puste pola (NaN/None) trafiają do bazy jako NULL.
+        """
+        buffer = io.StringIO()
+        df[columns].to_csv(buffer, index=False, header=False)
+        buffer.seek(0)
+        cursor = conn.connection.cursor()
+        try:
+            cursor.copy_expert(
+                f"COPY {table_name} ({', '.join(columns)}) FROM STDIN WITH (FORMAT csv)",
+                buffer,
+            )
+        finally:
+            cursor.close()
+
+    def _upsert_weather_rows(self, weather_df):
+        """Wstawia lub aktualizuje dane pogodowe wiersz po wierszu (jedno zapytanie na godzinę)."""
+        keys = weather_df.drop_duplicates(subset=["date", "hour", "type", "object_id"])
+        with self.engine.begin() as conn:
+            # RETURNING (xmax = 0) nie działa dla tabel partycjonowanych, dlatego
+            # liczbę aktualizacji ustalamy jednym zapytaniem o już istniejące klucze
+            existing = 0
+            for (type_value, object_id), group in keys.groupby(["type", "object_id"]):
+                existing += conn.execute(
+                    text(sql_queries.COUNT_EXISTING_WEATHER),
+                    {
+                        "dates": list(group["date"]),
+                        "hours": [int(hour) for hour in group["hour"]],
+                        "type": type_value,
+                        "object_id": int(object_id),
+                    },
+                ).scalar()
+            for _, row in weather_df.iterrows():
+                conn.execute(
+                    text(sql_queries.INSERT_OR_UPDATE_WEATHER),
+                    row.to_dict(),
+                )
+        inserted = len(keys) - existing
+        return inserted, len(weather_df) - inserted
+
+    def _upsert_weather_bulk(self, weather_df):
+        """
+        Ładuje dane pogodowe przez COPY do tymczasowej tabeli weather_staging,
+        a następnie wykonuje jedno INSERT ... SELECT ... ON CONFLICT DO UPDATE.
+        """
+        # ON CONFLICT nie może zaktualizować tego samego wiersza dwa razy w jednym
+        # poleceniu - zostawiamy ostatni rekord, tak jak przy zapisie wiersz po wierszu
+        weather_df = weather_df.drop_duplicates(
+            subset=["date", "hour", "type", "object_id"], keep="last"
         )
-        # is_holiday: 1 jeśli święto lub niedziela, 0 w przeciwnym razie
-        pl_holidays_dates = pd.to_datetime(list(pl_holidays)).date
-        df["date"] = pd.to_datetime(df["date"]).dt.date
-        df["is_holiday"] = (
-            df["date"].isin(pl_holidays_dates) | (df["day_of_week"] == 6)
-        ).astype(int)
-
-        # Upewnij się, że kolumna date jest typu datetime przed użyciem .dt.date
-        if not pd.api.types.is_datetime64_any_dtype(df["date"]):
-            df["date"] = pd.to_datetime(df["date"], errors="coerce")
-        df["date"] = df["date"].dt.date  # jeśli chcesz mieć datę bez czasu
-        return df
+        with self.engine.begin() as conn:
+            conn.execute(text(sql_queries.CREATE_WEATHER_STAGING))
+            self._copy_dataframe(
+                conn, "weather_staging", weather_df, list(weather_df.columns)
+            )
+            updated = conn.execute(
+                text(sql_queries.COUNT_EXISTING_WEATHER_FROM_STAGING)
+            ).scalar()
+            conn.execute(text(sql_queries.UPSERT_WEATHER_FROM_STAGING))
+        return len(weather_df) - updated, updated
 
-    def save_weather_data(self, df, type_value="real"):
+    def save_weather_data(self, df, type_value="real", bulk=True, object_id=1):
         """
         Zapisuje dane pogodowe z DataFrame do tabeli weather w bazie danych.
         Zakłada, że df ma kolumny: date, hour, temp, cloud, gti (nazwy zgodne z bazą).
-        Wstawia lub aktualizuje rekordy według klucza (date, hour, type).
+        Wstawia lub aktualizuje rekordy według klucza (date, hour, type, object_id).
+        bulk=True: jeden COPY do tabeli tymczasowej i jedno zapytanie upsert,
+        bulk=False: zapytanie INSERT_OR_UPDATE_WEATHER dla każdego wiersza.
+        Zwraca słownik z liczbą wstawionych i zaktualizowanych rekordów.
         """
         # Upewnij się, że kolumny są odpowiednio nazwane
         df = df.rename(
@@ -167,7 +664,8 @@ class DBManager:
         df["hour"] = pd.to_datetime(df["date"]).dt.hour
         df["date"] = pd.to_datetime(df["date"]).dt.date
         df["type"] = type_value
-        cols_to_insert = ["date", "hour", "temp", "cloud", "gti", "type"]
+        df["object_id"] = object_id
+        cols_to_insert = ["date", "hour", "temp", "cloud", "gti", "type", "object_id"]
         weather_df = df[cols_to_insert].dropna(subset=["temp", "cloud", "gti"])
 
         def get_oldest_date(weather_df):
@@ -180,97 +678,190 @@ class DBManager:
                 return weather_df["date"].max()
             return None
 
-        with self.engine.begin() as conn:
-            for _, row in weather_df.iterrows():
-                conn.execute(
-                    text(sql_queries.INSERT_OR_UPDATE_WEATHER),
-                    row.to_dict(),
-                )
+        self._ensure_partitions_for(weather_df)
+        if weather_df.empty:
+            inserted, updated = 0, 0
+        elif bulk:
+            inserted, updated = self._upsert_weather_bulk(weather_df)
+        else:
+            inserted, updated = self._upsert_weather_rows(weather_df)
+        if not weather_df.empty:
+            self._record_data_changes("weather", weather_df)
         self.logger.info(
-            f"Wstawiono lub zaktualizowano {len(weather_df)} typu {type_value} rekordów do tabeli weather.\nOd {get_oldest_date(weather_df)} do {get_latest_date(weather_df)}."
+            f"Wstawiono {inserted} i zaktualizowano {updated} rekordów typu {type_value} (obiekt {object_id}) w tabeli weather.\nOd {get_oldest_date(weather_df)} do {get_latest_date(weather_df)}."
         )
+        return {"inserted": inserted, "updated": updated}
+
+    def get_backfill_windows(self, object_id=1):
+        """Okna backfillu pogody (window_start, window_end) zapisane już dla obiektu."""
+        with self.engine.connect() as conn:
+            rows = conn.execute(
+                text(sql_queries.GET_BACKFILL_WINDOWS), {"object_id": object_id}
+            ).fetchall()
+        return {(row.window_start, row.window_end) for row in rows}
+
+    def record_backfill_window(self, window_start, window_end, rows, object_id=1):
+        with self.engine.begin() as conn:
+            conn.execute(
+                text(sql_queries.RECORD_BACKFILL_WINDOW),
+                {
+                    "object_id": object_id,
+                    "window_start": window_start,
+                    "window_end": window_end,
+                    "rows": rows,
+                },
+            )
 
-    def get_produced_energy_prediction_data(self):
+    def get_produced_energy_prediction_data(self, object_id=1):
         """
         Pobiera dane z bazy do predykcji (rekordy z produced_energy, gdzie produced_energy jest NULL),
         łącząc z danymi pogodowymi.
         """
-        query = text(sql_queries.GET_PRODUCED_ENERGY_PREDICTION_DATA)
-        df = pd.read_sql(query, self.engine)
-        df["date"] = pd.to_datetime(df["date"])
-        df["month"] = df["date"].dt.month
-        df["date"] = df["date"].dt.date
-        return df
+        return self.get_feature_data(PRODUCED_ENERGY_FEATURES, object_id, "prediction")
 
-    def update_predicted_produced_energy(self, df):
+    def _energy_update_rows(self, df, value_col):
         """
-        Aktualizuje kolumnę produced_energy w produced_energy na podstawie DataFrame (po predykcji).
+        Wiersze do aktualizacji: klucz (date, hour, type, object_id), prognoza i kolumny
+        przedziałów (<value_col>_p10/_p50/_p90), jeśli są w df; ich brak czyści przedziały w bazie.
+        """
+        key_cols = ["date", "hour", "type", "object_id"]
+        band_cols = [
+            f"{value_col}_{band}"
+            for band in schema.PREDICTION_BANDS
+            if f"{value_col}_{band}" in df.columns
+        ]
+        return df.loc[df[value_col].notna(), key_cols + [value_col] + band_cols].drop_duplicates(
+            subset=key_cols, keep="last"
+        )
+
+    def _stage_and_update(self, conn, update_df, staging_table, create_staging, update):
+        if update_df.empty:
+            return 0
+        conn.execute(text(create_staging))
+        self._copy_dataframe(conn, staging_table, update_df, list(update_df.columns))
+        return conn.execute(text(update)).rowcount
+
+    def _bulk_update_energy(self, df, value_col, staging_table, create_staging, update):
+        """
+        Ładuje przewidywania przez COPY do tabeli tymczasowej i aktualizuje tabelę docelową
+        jednym zapytaniem UPDATE ... FROM według klucza (date, hour, type, object_id).
         """
+        update_df = self._energy_update_rows(df, value_col)
+        if update_df.empty:
+            return 0
         with self.engine.begin() as conn:
-            for _, row in df.iterrows():
-                if pd.notna(row["produced_energy"]):
-                    conn.execute(
-                        text(sql_queries.UPDATE_PRODUCED_ENERGY),
-                        {
-                            "produced_energy": row["produced_energy"],
-                            "date": row["date"],
-                            "hour": row["hour"],
-                            "type": row["type"],
-                            "object_id": row["object_id"],
-                        },
-                    )
+            return self._stage_and_update(conn, update_df, staging_table, create_staging, update)
+
+    def _row_update_energy(self, df, value_col, update):
+        """
+        Aktualizuje tabelę zapytaniem UPDATE dla każdej godziny z prognozą; kolumny
+        przedziałów brakujące w df zapisywane są jako NULL (jak w _bulk_update_energy).
+        """
+        update_df = self._energy_update_rows(df, value_col)
+        band_cols = [f"{value_col}_{band}" for band in schema.PREDICTION_BANDS]
+        update_df = update_df.reindex(columns=list(dict.fromkeys([*update_df.columns, *band_cols])))
+        rows = [
+            {key: None if pd.isna(value) else value for key, value in row.items()}
+            for row in update_df.to_dict("records")
+        ]
+        if not rows:
+            return 0
+        with self.engine.begin() as conn:
+            conn.execute(text(update), rows)
+        return len(rows)
+
+    def update_predicted_energy(self, produced_df, sold_df):
+        """
+        Zapisuje prognozy produkcji i oddania w jednej transakcji (COPY do tabel tymczasowych
+        i UPDATE ... FROM dla obu tabel) - błąd zapisu jednej tabeli wycofuje obie.
+        """
+        produced_rows = self._energy_update_rows(produced_df, "produced_energy")
+        sold_rows = self._energy_update_rows(sold_df, "sold_energy")
+        with self.engine.begin() as conn:
+            produced_updated = self._stage_and_update(
+                conn,
+                produced_rows,
+                "produced_energy_staging",
+                sql_queries.CREATE_PRODUCED_ENERGY_STAGING,
+                sql_queries.BULK_UPDATE_PRODUCED_ENERGY,
+            )
+            sold_updated = self._stage_and_update(
+                conn,
+                sold_rows,
+                "sold_energy_staging",
+                sql_queries.CREATE_SOLD_ENERGY_STAGING,
+                sql_queries.BULK_UPDATE_SOLD_ENERGY,
+            )
+        self.logger.info(
+            f"Zaktualizowano {produced_updated} rekordów w produced_energy i {sold_updated} w sold_energy."
+        )
+        return {"produced_energy": produced_updated, "sold_energy": sold_updated}
+
+    def update_predicted_produced_energy(self, df, bulk=True):
+        """
+        Aktualizuje kolumnę produced_energy w produced_energy na podstawie DataFrame (po predykcji).
+        bulk=True: jedno zapytanie UPDATE ... FROM z tabeli tymczasowej,
+        bulk=False: osobne zapytanie UPDATE dla każdej godziny (także kolumny przedziałów).
+        """
+        if bulk:
+            updated = self._bulk_update_energy(
+                df,
+                "produced_energy",
+                "produced_energy_staging",
+                sql_queries.CREATE_PRODUCED_ENERGY_STAGING,
+                sql_queries.BULK_UPDATE_PRODUCED_ENERGY,
+            )
             self.logger.info(
-                f"Zaktualizowano {len(df)} rekordów w tabeli produced_energy."
+                f"Zaktualizowano {updated} rekordów w tabeli produced_energy."
             )
+            return
+        updated = self._row_update_energy(df, "produced_energy", sql_queries.UPDATE_PRODUCED_ENERGY)
+        self.logger.info(f"Zaktualizowano {updated} rekordów w tabeli produced_energy.")
 
-    def update_predicted_sold_energy(self, df):
+    def update_predicted_sold_energy(self, df, bulk=True):
         """
         Aktualizuje kolumnę sold_energy w tabeli sold_energy na podstawie DataFrame (po predykcji).
+        bulk=True: jedno zapytanie UPDATE ... FROM z tabeli tymczasowej,
+        bulk=False: osobne zapytanie UPDATE dla każdej godziny (także kolumny przedziałów).
         """
-        with self.engine.begin() as conn:
-            for _, row in df.iterrows():
-                if pd.notna(row["sold_energy"]):
-                    conn.execute(
-                        text(sql_queries.UPDATE_SOLD_ENERGY),
-                        {
-                            "sold_energy": row["sold_energy"],
-                            "date": row["date"],
-                            "hour": row["hour"],
-                            "type": row["type"],
-                            "object_id": row["object_id"],
-                        },
-                    )
-            self.logger.info(f"Zaktualizowano {len(df)} rekordów w tabeli sold_energy.")
+        if bulk:
+            updated = self._bulk_update_energy(
+                df,
+                "sold_energy",
+                "sold_energy_staging",
+                sql_queries.CREATE_SOLD_ENERGY_STAGING,
+                sql_queries.BULK_UPDATE_SOLD_ENERGY,
+            )
+            self.logger.info(f"Zaktualizowano {updated} rekordów w tabeli sold_energy.")
+            return
+        updated = self._row_update_energy(df, "sold_energy", sql_queries.UPDATE_SOLD_ENERGY)
+        self.logger.info(f"Zaktualizowano {updated} rekordów w tabeli sold_energy.")
 
-    def clear_predicted_rows(self, from_date=None):
+    def clear_predicted_rows(self, from_date=None, object_id=None):
         """
         Usuwa rekordy typu 'predicted' z obu tabel: produced_energy i sold_energy od podanej daty (włącznie).
         Jeśli from_date nie jest podane, domyślnie czyści od dzisiaj.
+        object_id=None czyści prognozy wszystkich obiektów.
         """
 
         if from_date is None:
             from_date = datetime.date.today()
+        params = {"from_date": from_date, "object_id": object_id}
         with self.engine.begin() as conn:
-            conn.execute(
-                text(sql_queries.DELETE_PRODUCED_ENERGY_PREDICTION),
-                {"from_date": from_date},
-            )
-            conn.execute(
-                text(sql_queries.DELETE_SOLD_ENERGY_PREDICTION),
-                {"from_date": from_date},
-            )
+            conn.execute(text(sql_queries.DELETE_PRODUCED_ENERGY_PREDICTION), params)
+            conn.execute(text(sql_queries.DELETE_SOLD_ENERGY_PREDICTION), params)
 
         self.logger.info(
-            f"Usunięto rekordy typu 'predicted' z produced_energy i sold_energy od daty {from_date}."
+            f"Usunięto rekordy typu 'predicted' z produced_energy i sold_energy od daty {from_date} (obiekt {object_id or 'wszystkie'})."
         )
 
     def insert_empty_predicted_rows(self, object_id=1):
         """
         Wstawia puste rekordy (NULL) typu 'predicted' do obu tabel: produced_energy i sold_energy
-        dla wszystkich dat/godzin z weather typu 'predicted'.
+        dla wszystkich dat/godzin z weather typu 'predicted' danego obiektu.
         """
         query = text(sql_queries.SELECT_DISTINCT_PREDICTED_WEATHER)
-        df = pd.read_sql(query, self.engine)
+        df = pd.read_sql(query, self.engine, params={"object_id": object_id})
         df["type"] = "predicted"
         df["object_id"] = object_id
         # produced_energy
@@ -293,24 +884,12 @@ class DBManager:
             f"Wstawiono puste rekordy typu 'predicted' do produced_energy i sold_energy dla {len(df)} dat/godzin. Od {df['date'].min()} do {df['date'].max()}."
         )
 
-    def get_sold_energy_prediction_data(self):
+    def get_sold_energy_prediction_data(self, object_id=1):
         """
         Pobiera dane z bazy do predykcji (rekordy z sold_energy, gdzie sold_energy jest NULL),
         łącząc z danymi produkcji PV oraz wylicza cechy wymagane do predykcji.
         """
-        query = text(sql_queries.GET_SOLD_ENERGY_PREDICTION_DATA)
-        df = pd.read_sql(query, self.engine)
-        if not df.empty:
-            df["date"] = pd.to_datetime(df["date"])
-            df["month"] = df["date"].dt.month
-            df["day_of_week"] = df["date"].dt.weekday
-
-            pl_holidays = holidays.Poland(years=df["date"].dt.year.unique())
-            df["is_holiday"] = (
-                df["date"].dt.date.isin(pl_holidays) | (df["day_of_week"] == 6)
-            ).astype(int)
-            df["date"] = df["date"].dt.date
-        return df
+        return self.get_feature_data(SOLD_ENERGY_FEATURES, object_id, "prediction")
 
     def get_energy_for_date(
         self, date, energy_type="produced", data_type="real", object_id=1
@@ -362,14 +941,22 @@ class DBManager:
                 "produced_energy", pv_df, ["date", "hour", "type", "object_id"]
             )
 
-    def import_data_from_csv(self, csv_path, object_id, type_value="real"):
-        """
-        Importuje dane produkcji energii z pliku CSV (Timestamp;Value) do bazy dla wybranego object_id.
-        """
-        df = pd.read_csv(csv_path, sep=";", decimal=",")
+    def _read_csv_chunks(self, csv_path, chunksize, checkpoint, **read_kwargs):
+        # wiersze przetworzone przed przerwaniem są pomijane już na etapie parsowania
+        return pd.read_csv(
+            csv_path,
+            sep=";",
+            decimal=",",
+            chunksize=chunksize,
+            skiprows=range(1, checkpoint.rows_done + 1),
+            **read_kwargs,
+        )
+
+    def _prepare_produced_energy_csv(self, df, object_id, type_value):
         # Rozbij Timestamp na date i hour
-        df["date"] = pd.to_datetime(df["Timestamp"]).dt.date.astype(str)
-        df["hour"] = pd.to_datetime(df["Timestamp"]).dt.hour
+        timestamp = pd.to_datetime(df["Timestamp"])
+        df["date"] = timestamp.dt.date.astype(str)
+        df["hour"] = timestamp.dt.hour
         df["produced_energy"] = df["Value"]
         df["produced_energy"] = df["produced_energy"].astype(str).str.replace(",", ".")
         # Zamień 'Bad' i inne nieprawidłowe na NaN, ale NIE usuwaj tych wierszy
@@ -378,20 +965,73 @@ class DBManager:
         pv_df = df[["date", "hour", "produced_energy"]].copy()
         pv_df["type"] = type_value
         pv_df["object_id"] = object_id
+        return pv_df
+
+    def import_data_from_csv(
+        self,
+        csv_path,
+        object_id,
+        type_value="real",
+        chunksize=None,
+        checkpoint_path=DEFAULT_CHECKPOINT_FILE,
+    ):
+        """
+        Importuje dane produkcji energii z pliku CSV (Timestamp;Value) do bazy dla wybranego object_id.
+        chunksize: jeśli podany, plik importowany jest paczkami z zapisem postępu w checkpoint_path.
+        """
+        if chunksize:
+            checkpoint = ImportCheckpoint(
+                csv_path, f"produced_csv:{type_value}:{object_id}", checkpoint_path
+            )
+            return self._run_chunked_import(
+                self._read_csv_chunks(csv_path, chunksize, checkpoint),
+                checkpoint,
+                lambda chunk: self._insert_ignore_duplicates(
+                    "produced_energy",
+                    self._prepare_produced_energy_csv(chunk, object_id, type_value),
+                    ENERGY_UNIQUE_COLS,
+                ),
+            )
+        df = pd.read_csv(csv_path, sep=";", decimal=",")
+        pv_df = self._prepare_produced_energy_csv(df, object_id, type_value)
         # Wstaw dane do bazy (analogicznie jak w import_data_from_excel)
-        self._insert_ignore_duplicates(
-            "produced_energy", pv_df, ["date", "hour", "type", "object_id"]
-        )
+        self._insert_ignore_duplicates("produced_energy", pv_df, ENERGY_UNIQUE_COLS)
         return len(pv_df)
 
-    def import_weather_from_csv(self, csv_path, type_value="real"):
+    def import_weather_from_csv(
+        self,
+        csv_path,
+        type_value="real",
+        chunksize=None,
+        checkpoint_path=DEFAULT_CHECKPOINT_FILE,
+        object_id=1,
+    ):
+        """
+        Importuje dane pogodowe z pliku CSV (wstawia lub aktualizuje rekordy).
+        chunksize: jeśli podany, plik importowany jest paczkami z zapisem postępu w checkpoint_path.
+        """
+        if chunksize:
+            checkpoint = ImportCheckpoint(
+                csv_path, f"weather_csv:{type_value}:{object_id}", checkpoint_path
+            )
+
+            def import_chunk(chunk):
+                result = self.save_weather_data(
+                    chunk, type_value=type_value, object_id=object_id
+                )
+                return result["inserted"] + result["updated"]
+
+            return self._run_chunked_import(
+                self._read_csv_chunks(csv_path, chunksize, checkpoint),
+                checkpoint,
+                import_chunk,
+            )
         df = pd.read_csv(csv_path, sep=";", decimal=",")
         # Jeśli kolumna 'date' zawiera godzinę, wyodrębnij godzinę do osobnej kolumny
         df["hour"] = pd.to_datetime(df["date"]).dt.hour
-        self.save_weather_data(df, type_value=type_value)
+        self.save_weather_data(df, type_value=type_value, object_id=object_id)
 
-    def import_sold_energy_from_csv(self, csv_path, type_value="real", object_id=None):
-        df = pd.read_csv(csv_path, sep=';', decimal=',', dtype=str)
+    def _prepare_sold_energy_csv(self, df, object_id, type_value):
         df.columns = df.columns.str.strip().str.replace('"', '')
         # Konwersja daty
         df['date'] = pd.to_datetime(df['date'], errors='coerce')
@@ -406,13 +1046,40 @@ class DBManager:
         df['object_id'] = object_id
         # Usuń wiersze z brakującą datą, godziną lub energią
         df = df.dropna(subset=['date', 'hour', 'sold_energy'])
+        return df[["date", "hour", "sold_energy", "type", "object_id"]]
+
+    def import_sold_energy_from_csv(
+        self,
+        csv_path,
+        type_value="real",
+        object_id=None,
+        chunksize=None,
+        checkpoint_path=DEFAULT_CHECKPOINT_FILE,
+    ):
+        """
+        Importuje dane energii oddanej z pliku CSV (date;sold_energy).
+        chunksize: jeśli podany, plik importowany jest paczkami z zapisem postępu w checkpoint_path.
+        """
+        if chunksize:
+            checkpoint = ImportCheckpoint(
+                csv_path, f"sold_csv:{type_value}:{object_id}", checkpoint_path
+            )
+            return self._run_chunked_import(
+                self._read_csv_chunks(csv_path, chunksize, checkpoint, dtype=str),
+                checkpoint,
+                lambda chunk: self._insert_ignore_duplicates(
+                    "sold_energy",
+                    self._prepare_sold_energy_csv(chunk, object_id, type_value),
+                    ENERGY_UNIQUE_COLS,
+                ),
+            )
+        df = pd.read_csv(csv_path, sep=';', decimal=',', dtype=str)
         # Wstaw do bazy
         self._insert_ignore_duplicates(
             "sold_energy",
-            df[["date", "hour", "sold_energy", "type", "object_id"]],
-            ["date", "hour", "type", "object_id"]
+            self._prepare_sold_energy_csv(df, object_id, type_value),
+            ENERGY_UNIQUE_COLS,
         )
- 
 
 
 if __name__ == "__main__":
@@ -1,15 +1,16 @@
 from base_predictor import BasePredictor
+from feature_store import PRODUCED_ENERGY_FEATURES
 
 
 class EnergyProductionPredictor(BasePredictor):
-    def __init__(self, input_path, output_pred_path, output_pivot_path):
+    def __init__(self, input_path, output_pred_path, output_pivot_path, **kwargs):
         super().__init__(
             input_path=input_path,
             output_pred_path=output_pred_path,
             output_pivot_path=output_pivot_path,
-            features=["temp", "gti", "cloud", "hour", "month"],
-            target="produced_energy",
+            feature_set=PRODUCED_ENERGY_FEATURES,
             pivot_value="produced_energy",
+            **kwargs,
         )
 
 
@@ -0,0 +1,113 @@
+from dataclasses import dataclass
+
+import numpy as np
+import pandas as pd
+
+import sql_queries
+from calendar_dimension import CALENDAR_FEATURES, calendar_features
+
+# tryb -> (typ rekordów, filtr celu): trening na danych rzeczywistych ze znanym celem,
+# predykcja dla pustych rekordów prognozy
+MODES = {
+    "training": ("real", "NOT"),
+    "prediction": ("predicted", ""),
+}
+
+# zwarte typy kolumn; cechy z bazy trafiają do float32 (drzewa sklearn i tak liczą w float32),
+# cel zostaje float64, bo wraca do bazy
+COMPACT_DTYPES = {
+    "hour": "int8",
+    "month": "int8",
+    "day_of_week": "int8",
+    "is_holiday": "int8",
+    "is_dst": "int8",
+    "object_id": "int32",
+    "type": "category",
+}
+
+
+@dataclass(frozen=True)
+class FeatureSet:
+    """
+    Deklaracja danych modelu: cel w tabeli target_table oraz cechy w kolejności podawanej
+    do modelu. Cechy spoza hour i CALENDAR_FEATURES pobierane są z kolumn source_table.
+    """
+
+    target_table: str
+    target: str
+    source_table: str
+    features: tuple
+
+    @property
+    def source_columns(self):
+        return [f for f in self.features if f != "hour" and f not in CALENDAR_FEATURES]
+
+    @property
+    def derived_features(self):
+        return [f for f in self.features if f in CALENDAR_FEATURES]
+
+    def query(self, mode, since=False):
+        """Zapytanie SQL dla trybu "training" lub "prediction" (parametry: params())."""
+        _, target_filter = MODES[mode]
+        query = sql_queries.GET_FEATURE_DATA.format(
+            source_columns=",\n    ".join(f"src.{col}" for col in self.source_columns),
+            target=self.target,
+            target_table=self.target_table,
+            source_table=self.source_table,
+            target_filter=target_filter,
+        )
+        return query + sql_queries.FEATURE_DATA_SINCE_FILTER if since else query
+
+    def params(self, mode, object_id):
+        return {"type": MODES[mode][0], "object_id": object_id}
+
+
+PRODUCED_ENERGY_FEATURES = FeatureSet(
+    target_table="produced_energy",
+    target="produced_energy",
+    source_table="weather",
+    features=("temp", "gti", "cloud", "hour", "month"),
+)
+
+SOLD_ENERGY_FEATURES = FeatureSet(
+    target_table="sold_energy",
+    target="sold_energy",
+    source_table="produced_energy",
+    features=("produced_energy", "hour", "is_holiday", "day_of_week", "month"),
+)
+
+
+def add_derived_features(df, feature_set):
+    """
+    Jednym przebiegiem: zamienia date na obiekty date, dolicza cechy kalendarzowe
+    zestawu (odczyt z wymiaru kalendarza raz na unikalny dzień) i ustawia zwarte typy kolumn.
+    """
+    codes, days = pd.factorize(pd.to_datetime(df["date"]))
+    df["date"] = np.asarray(days.date, dtype=object)[codes]
+    for name, values in calendar_features(days, feature_set.derived_features).items():
+        df[name] = values[codes]
+    dtypes = {col: COMPACT_DTYPES[col] for col in df.columns if col in COMPACT_DTYPES}
+    dtypes.update({col: "float32" for col in feature_set.source_columns if col in df.columns})
+    if feature_set.target in df.columns:
+        dtypes[feature_set.target] = "float64"
+    return df.astype(dtypes)
+
+
+def chained_prediction_data(source_df, feature_set):
+    """
+    Dane do predykcji zestawu cech zbudowane w pamięci z ramki prognozy modelu
+    źródłowego (np. produkcji po predict_missing) zamiast zapisu do bazy i ponownego
+    odczytu przez GET_FEATURE_DATA. Kolumny w tej samej kolejności co z zapytania,
+    cel pusty (do prognozy).
+    """
+    df = pd.DataFrame(
+        {
+            "date": source_df["date"].to_numpy(),
+            "hour": source_df["hour"].to_numpy(),
+            **{col: source_df[col].to_numpy() for col in feature_set.source_columns},
+            feature_set.target: np.nan,
+            "type": source_df["type"].astype(str).to_numpy(),
+            "object_id": source_df["object_id"].to_numpy(),
+        }
+    )
+    return add_derived_features(df, feature_set)
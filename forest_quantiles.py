@@ -0,0 +1,36 @@
+import numpy as np
+
+
+def leaf_value_matrix(forest):
+    """
+    Wartości węzłów wszystkich drzew lasu w jednej macierzy (n_trees x max_nodes),
+    uzupełnionej zerami dla krótszych drzew.
+    """
+    trees = [estimator.tree_ for estimator in forest.estimators_]
+    values = np.zeros((len(trees), max(tree.node_count for tree in trees)))
+    for i, tree in enumerate(trees):
+        values[i, : tree.node_count] = tree.value[:, 0, 0]
+    return values
+
+
+def per_tree_predictions(forest, X):
+    """
+    Prognozy każdego drzewa jako macierz (n_trees x n_rows): forest.apply zwraca liście
+    wszystkich drzew, a ich wartości odczytywane są jednym indeksowaniem macierzy liści.
+    Las w postaci CompactForest liczy tę macierz sam.
+    """
+    if hasattr(forest, "per_tree_predict"):
+        return forest.per_tree_predict(X)
+    leaves = forest.apply(X)
+    values = leaf_value_matrix(forest)
+    return values[np.arange(values.shape[0])[:, None], leaves.T]
+
+
+def forest_quantiles(forest, X, quantiles):
+    """Kwantyle prognoz drzew dla każdego wiersza X; wynik (len(quantiles) x n_rows)."""
+    return np.quantile(per_tree_predictions(forest, X), quantiles, axis=0)
+
+
+def band_name(quantile):
+    """0.1 -> "p10"."""
+    return f"p{round(quantile * 100)}"
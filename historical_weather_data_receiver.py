@@ -2,32 +2,36 @@ import openmeteo_requests
 import pandas as pd
 import requests_cache
 from retry_requests import retry
+from timezones import TIMEZONE, local_wall_time
+from weather_batch import MAX_WORKERS, SITES_PER_REQUEST, fetch_sites, hourly_frame
+from weather_quality import filter_complete_weather_days
 
 
 class HistoricalWeatherDataReceiver:
-    def __init__(self, latitude, longitude, start_date, end_date, output_file=None):
+    API_URL = "https://archive-api.open-meteo.com/v1/archive"
+    HOURLY = ["temperature_2m", "cloud_cover", "global_tilted_irradiance_instant"]
+    # nazwy kolumn zmiennych HOURLY (irradiancja ujednolicona z prognozą)
+    COLUMNS = ["temperature_2m", "cloud_cover", "global_tilted_irradiance"]
+
+    def __init__(self, latitude, longitude, start_date, end_date, output_file=None, cache_name=".cache"):
         self.latitude = latitude
         self.longitude = longitude
         self.start_date = start_date
-        self.timezone = "Europe/Warsaw"
+        self.timezone = TIMEZONE
         self.end_date = end_date
         self.output_file = output_file
-        self.cache_session = requests_cache.CachedSession(".cache", expire_after=-1)
+        self.cache_session = requests_cache.CachedSession(cache_name, expire_after=-1)
         self.retry_session = retry(self.cache_session, retries=5, backoff_factor=0.2)
         self.openmeteo = openmeteo_requests.Client(session=self.retry_session)
 
-    def shift_hour_dst_only(self, df, date_col='date'):
-        dt = pd.to_datetime(df[date_col])
-        # Lokalizacja lub konwersja do strefy Europe/Berlin
-        if dt.dt.tz is None:
-            dt_local = dt.dt.tz_localize('Europe/Berlin', ambiguous='NaT', nonexistent='shift_forward')
-        else:
-            dt_local = dt.dt.tz_convert('Europe/Berlin')
-        # Sprawdzenie DST dla każdej daty
-        is_dst = dt_local.map(lambda x: x.dst() != pd.Timedelta(0))
-        # Dodanie godziny tylko tam, gdzie DST
-        df.loc[is_dst, date_col] = dt[is_dst] + pd.Timedelta(hours=1)
-        df.loc[~is_dst, date_col] = dt[~is_dst]
+    def shift_hour_dst_only(self, df, date_col="date"):
+        """
+        Zamienia czasy UTC z API na czas lokalny self.timezone bez strefy, tak jak odbiornik
+        prognozy (timezones.local_wall_time), więc pogoda rzeczywista do treningu i prognoza
+        do predykcji mają te same godziny. Zwraca kopię df.
+        """
+        df = df.copy()
+        df[date_col] = local_wall_time(df[date_col], self.timezone)
         return df
 
     def print_api_metadata(self, response):
@@ -36,45 +40,51 @@ class HistoricalWeatherDataReceiver:
         print(f"Timezone {response.Timezone()}{response.TimezoneAbbreviation()}")
         print(f"Timezone difference to GMT+0 {response.UtcOffsetSeconds()} s")
 
-    def fetch_historical_data(self):
-        url = "https://archive-api.open-meteo.com/v1/archive"
-        params = {
+    def get_api_params(self, start_date=None, end_date=None):
+        """Parametry zapytania; start_date/end_date zawężają zakres odbiornika (np. okno backfillu)."""
+        return {
             "latitude": self.latitude,
             "longitude": self.longitude,
-            "start_date": self.start_date,
-            "end_date": self.end_date,
+            "start_date": start_date or self.start_date,
+            "end_date": end_date or self.end_date,
             "timezone": self.timezone,
-            "hourly": [
-                "temperature_2m",
-                "cloud_cover",
-                "global_tilted_irradiance_instant",
-            ],
+            "hourly": self.HOURLY,
         }
-        responses = self.openmeteo.weather_api(url, params=params)
+
+    def fetch_historical_data(self, start_date=None, end_date=None):
+        responses = self.openmeteo.weather_api(
+            self.API_URL, params=self.get_api_params(start_date, end_date)
+        )
         response = responses[0]
 
-        hourly = response.Hourly()
-        hourly_temperature_2m = hourly.Variables(0).ValuesAsNumpy()
-        hourly_cloud_cover = hourly.Variables(1).ValuesAsNumpy()
-        hourly_global_tilted_irradiance = hourly.Variables(2).ValuesAsNumpy()
-
-        hourly_data = {
-            "date": pd.date_range(
-                start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
-                end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
-                freq=pd.Timedelta(seconds=hourly.Interval()),
-                inclusive="left",
-            ),
-            "temperature_2m": hourly_temperature_2m,
-            "cloud_cover": hourly_cloud_cover,
-            "global_tilted_irradiance": hourly_global_tilted_irradiance,  # Ujednolicona nazwa
-        }
-        df = pd.DataFrame(data=hourly_data)
+        df = hourly_frame(response, self.COLUMNS)
         print(df.columns)
-        df = self.shift_hour_dst_only(df)
-        if pd.api.types.is_datetime64_any_dtype(df["date"]):
-            df["date"] = df["date"].dt.tz_localize(None)
-        return df
+        return self._to_local_time(df)
+
+    def _to_local_time(self, df):
+        return self.shift_hour_dst_only(df)
+
+    def fetch_historical_data_for_sites(self, sites, sites_per_request=SITES_PER_REQUEST, max_workers=MAX_WORKERS):
+        """
+        Dane historyczne dla wielu obiektów (sites.Site) w zakresie dat odbiornika - zapytania
+        wielolokalizacyjne wysyłane równolegle (weather_batch.fetch_sites).
+        Zwraca ramkę z kolumną object_id.
+        """
+        params = {
+            key: value
+            for key, value in self.get_api_params().items()
+            if key not in ("latitude", "longitude")
+        }
+        return fetch_sites(
+            self.openmeteo,
+            self.API_URL,
+            params,
+            sites,
+            self.COLUMNS,
+            self._to_local_time,
+            sites_per_request,
+            max_workers,
+        )
 
     def save_to_excel(self, df, excel_path):
         df.to_excel(excel_path, index=False)
@@ -83,19 +93,9 @@ class HistoricalWeatherDataReceiver:
     def display(self, df, n=5):
         print(df.head(n))
 
-    def filter_complete_days(self, df):
-        """
-        Zwraca DataFrame zawierający tylko te daty, które mają kompletne dane pogodowe (24 godziny: 0-23) i brak NaN.
-        """
-        df["date_only"] = pd.to_datetime(df["date"]).dt.date
-
-        def is_complete_and_no_nan(x):
-            return (
-                set(x["date"].dt.hour) == set(range(24)) and not x.isnull().any().any()
-            )
-
-        complete_days = df.groupby("date_only").filter(is_complete_and_no_nan)
-        return complete_days.drop(columns=["date_only"])
+    def filter_complete_days(self, df, date_col="date"):
+        """Tylko pełne dni bez NaN (weather_quality.filter_complete_weather_days)."""
+        return filter_complete_weather_days(df, date_col)
 
     def run(self):
         df = self.fetch_historical_data()
@@ -0,0 +1,55 @@
+import json
+import os
+
+DEFAULT_CHECKPOINT_FILE = ".import_checkpoint.json"
+
+
+class ImportCheckpoint:
+    """
+    Przechowuje postęp strumieniowego importu pliku (liczbę przetworzonych wierszy)
+    w pliku JSON, aby przerwany import można było wznowić od miejsca przerwania.
+    Zmiana rozmiaru lub daty modyfikacji pliku źródłowego unieważnia zapisany postęp.
+    """
+
+    def __init__(self, source_path, kind, checkpoint_path=DEFAULT_CHECKPOINT_FILE):
+        self.source_path = source_path
+        self.checkpoint_path = checkpoint_path
+        self.key = f"{kind}:{os.path.abspath(source_path)}"
+        stat = os.stat(source_path)
+        self.fingerprint = [stat.st_size, stat.st_mtime_ns]
+
+        entry = self._load().get(self.key)
+        if entry and entry["fingerprint"] == self.fingerprint:
+            self.rows_done = entry["rows_done"]
+            self.state = entry.get("state", {})
+        else:
+            self.rows_done = 0
+            self.state = {}
+
+    def _load(self):
+        if not os.path.exists(self.checkpoint_path):
+            return {}
+        with open(self.checkpoint_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write(self, entries):
+        # zapis przez plik tymczasowy, żeby przerwanie nie uszkodziło checkpointu
+        tmp_path = f"{self.checkpoint_path}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            json.dump(entries, f, indent=2)
+        os.replace(tmp_path, self.checkpoint_path)
+
+    def save(self, rows_done):
+        self.rows_done = rows_done
+        entries = self._load()
+        entries[self.key] = {
+            "fingerprint": self.fingerprint,
+            "rows_done": rows_done,
+            "state": self.state,
+        }
+        self._write(entries)
+
+    def clear(self):
+        entries = self._load()
+        if entries.pop(self.key, None) is not None:
+            self._write(entries)
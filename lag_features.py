@@ -0,0 +1,151 @@
+import numpy as np
+import pandas as pd
+
+DEFAULT_LAGS = (1, 24)
+DEFAULT_ROLLING_WINDOWS = (24,)
+
+
+def lag_feature_names(lags=DEFAULT_LAGS, rolling_windows=DEFAULT_ROLLING_WINDOWS):
+    return [f"lag_{lag}" for lag in lags] + [
+        f"rolling_mean_{window}" for window in rolling_windows
+    ]
+
+
+def _hourly_timestamps(df):
+    return pd.to_datetime(df["date"]) + pd.to_timedelta(df["hour"], unit="h")
+
+
+def _build_grid(frames, target, object_col):
+    """
+    Układa wartości target z kilku ramek na wspólnej siatce godzinowej
+    (obiekt x godzina od najwcześniejszego znacznika czasu). Brakujące godziny to NaN.
+    Zwraca siatkę oraz dla każdej ramki tablice (indeks obiektu, indeks godziny) jej wierszy.
+    """
+    use_objects = all(object_col in df.columns for df in frames)
+    timestamps = [_hourly_timestamps(df) for df in frames]
+    origin = min(ts.min() for ts in timestamps if len(ts))
+    columns = [
+        ((ts - origin) // pd.Timedelta(hours=1)).to_numpy(dtype=np.int64) for ts in timestamps
+    ]
+    if use_objects:
+        object_ids, codes = np.unique(
+            np.concatenate([df[object_col].to_numpy() for df in frames]), return_inverse=True
+        )
+        rows = np.split(codes, np.cumsum([len(df) for df in frames])[:-1])
+    else:
+        object_ids = np.zeros(1)
+        rows = [np.zeros(len(df), dtype=np.int64) for df in frames]
+
+    n_hours = max(int(col.max()) for col in columns if len(col)) + 1
+    grid = np.full((len(object_ids), n_hours), np.nan)
+    for df, row, col in zip(frames, rows, columns):
+        if target in df.columns:
+            values = df[target].to_numpy(dtype=float)
+            known = ~np.isnan(values)
+            grid[row[known], col[known]] = values[known]
+    return grid, list(zip(rows, columns))
+
+
+def _lag_values(grid, rows, columns, lag):
+    source = columns - lag
+    values = np.full(len(rows), np.nan)
+    valid = source >= 0
+    values[valid] = grid[rows[valid], source[valid]]
+    return values
+
+
+def _rolling_means(grid, rows, columns, window):
+    """Średnia z godzin [t - window, t - 1] z pominięciem braków (NaN, gdy brak wszystkich)."""
+    known = ~np.isnan(grid)
+    sums = np.zeros((grid.shape[0], grid.shape[1] + 1))
+    counts = np.zeros_like(sums)
+    np.cumsum(np.where(known, grid, 0.0), axis=1, out=sums[:, 1:])
+    np.cumsum(known, axis=1, out=counts[:, 1:])
+    start = np.maximum(columns - window, 0)
+    total = sums[rows, columns] - sums[rows, start]
+    count = counts[rows, columns] - counts[rows, start]
+    with np.errstate(invalid="ignore", divide="ignore"):
+        return np.where(count > 0, total / count, np.nan)
+
+
+def add_lag_features(
+    df,
+    target,
+    lags=DEFAULT_LAGS,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS,
+    object_col="object_id",
+):
+    """
+    Zwraca kopię df z kolumnami lag_<k> (wartość target sprzed k godzin) i rolling_mean_<w>
+    (średnia z w poprzednich godzin). Wartości liczone są wektorowo na siatce
+    (obiekt, godzina), więc luki w danych dają NaN zamiast wartości z przesuniętego wiersza.
+    """
+    df = df.copy()
+    if df.empty:
+        for name in lag_feature_names(lags, rolling_windows):
+            df[name] = np.nan
+        return df
+    grid, [(rows, columns)] = _build_grid([df], target, object_col)
+    for lag in lags:
+        df[f"lag_{lag}"] = _lag_values(grid, rows, columns, lag)
+    for window in rolling_windows:
+        df[f"rolling_mean_{window}"] = _rolling_means(grid, rows, columns, window)
+    return df
+
+
+def recursive_forecast(
+    model,
+    history,
+    future,
+    features,
+    target,
+    lags=DEFAULT_LAGS,
+    rolling_windows=DEFAULT_ROLLING_WINDOWS,
+    object_col="object_id",
+    return_features=False,
+):
+    """
+    Prognoza wielokrokowa z cechami opóźnionymi: wiersze future przewidywane są krokami
+    horyzontu, a każda prognoza trafia na siatkę i służy jako opóźnienie dla kolejnych godzin.
+    Jeden krok obejmuje wszystkie obiekty i - bez średnich kroczących - min(lags) kolejnych
+    godzin, bo ich opóźnienia są już znane. Zwraca tablicę prognoz w kolejności wierszy future,
+    a z return_features=True także macierz cech (z wypełnionymi opóźnieniami) użytą do prognozy.
+    """
+    if future.empty:
+        empty = np.array([])
+        return (empty, np.empty((0, len(features)))) if return_features else empty
+    # do siatki potrzebna jest tylko końcówka historii sięgająca najdłuższego opóźnienia
+    lookback = max(list(lags) + list(rolling_windows), default=0)
+    first_hour = _hourly_timestamps(future).min() - pd.Timedelta(hours=lookback)
+    history = history[_hourly_timestamps(history) >= first_hour]
+    grid, [_, (rows, columns)] = _build_grid([history, future], target, object_col)
+    lag_names = lag_feature_names(lags, rolling_windows)
+    base = future.reindex(columns=features).to_numpy(dtype=float)
+    lag_positions = {name: features.index(name) for name in lag_names if name in features}
+    block = min(lags) if lags and not rolling_windows else 1
+
+    predictions = np.full(len(future), np.nan)
+    used_features = np.empty_like(base)
+    order = np.argsort(columns, kind="stable")
+    sorted_columns = columns[order]
+    start = 0
+    while start < len(order):
+        end = np.searchsorted(sorted_columns, sorted_columns[start] + block, side="left")
+        batch = order[start:end]
+        X = base[batch]
+        for lag in lags:
+            name = f"lag_{lag}"
+            if name in lag_positions:
+                X[:, lag_positions[name]] = _lag_values(grid, rows[batch], columns[batch], lag)
+        for window in rolling_windows:
+            name = f"rolling_mean_{window}"
+            if name in lag_positions:
+                X[:, lag_positions[name]] = _rolling_means(
+                    grid, rows[batch], columns[batch], window
+                )
+        used_features[batch] = X
+        y_pred = model.predict(pd.DataFrame(X, columns=features))
+        grid[rows[batch], columns[batch]] = y_pred
+        predictions[batch] = y_pred
+        start = end
+    return (predictions, used_features) if return_features else predictions
@@ -1,4 +1,10 @@
+import argparse
 import logging
+import time
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+
 import pandas as pd
 from db_manager import DBManager
 from table_with_tabs import TableWithTabs
@@ -6,6 +12,12 @@ from sold_energy_predictor import SoldEnergyPredictor
 from weather_data_receiver import ForecastWeatherDataReceiver
 from energy_production_predictor import EnergyProductionPredictor
 from historical_weather_data_receiver import HistoricalWeatherDataReceiver
+from weather_backfill import backfill_historical_weather, complete_windows_end
+from model_registry import ModelRegistry
+from forest_quantiles import band_name
+from feature_store import SOLD_ENERGY_FEATURES, chained_prediction_data
+from lag_features import DEFAULT_LAGS, DEFAULT_ROLLING_WINDOWS
+from sites import HISTORY_START, Site, load_sites
 
 logging.basicConfig(level=logging.INFO)
 
@@ -14,6 +26,24 @@ LATITUDE = 49.6887
 LONGITUDE = 21.7706
 HISTORICAL_FILE = "data/weather/historical_weather.xlsx"
 FORECAST_FILE = "data/weather/forecast_weather.xlsx"
+MODEL_DIR = "models"
+# przyrostowy cache danych treningowych (Parquet); None - pełne zapytanie przy każdym treningu
+CACHE_DIR = "models/training_cache"
+# None: konfiguracja z tuningu (scripts/tune_models.py) zapisana w rejestrze lub domyślna
+MODEL_BACKEND = None
+# przedziały prognozy P10/P50/P90 z drzew lasu, zapisywane obok prognozy punktowej
+PREDICTION_QUANTILES = (0.1, 0.5, 0.9)
+# po treningu lasy zamieniane są na płaskie tablice NumPy (compact_forest.CompactForest);
+# np. {"max_depth": 12} dodatkowo przycina drzewa, None wyłącza
+COMPACT_MODEL = {}
+# prognoza produkcji trafia do modelu oddania w pamięci, a obie tabele zapisywane są
+# raz, w jednej transakcji; False - zapis produkcji do bazy i odczyt przez zapytanie
+CHAIN_PREDICTIONS = True
+# pogoda historyczna od site.history_start pobierana jest oknami miesięcznymi z checkpointem
+# (weather_backfill) dla pełnych miesięcy starszych niż BACKFILL_AFTER_DAYS dni,
+# a nowsze dni jednym zapytaniem
+BACKFILL_AFTER_DAYS = 31
+DEFAULT_SITE = Site(object_id=1, latitude=LATITUDE, longitude=LONGITUDE)
 
 
 def save_pivots_to_excel(pivot_dict, output_path):
@@ -25,9 +55,55 @@ def save_pivots_to_excel(pivot_dict, output_path):
     print(f"Pivots zapisane do {output_path} (arkusze: {', '.join(pivot_dict.keys())})")
 
 
-def train_predictor(predictor, training_data):
+@contextmanager
+def stage(timings, name):
+    """Mierzy czas (wall) bloku i zapisuje go w timings[name] w sekundach."""
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        timings[name] = time.perf_counter() - start
+
+
+def format_timings(timings):
+    return ", ".join(f"{name} {seconds:.2f} s" for name, seconds in timings.items())
+
+
+def train_predictor(predictor, training_data, incremental=False):
     predictor.load_data(training_data)
-    predictor.train_model()
+    if incremental:
+        predictor.update_model()
+    else:
+        predictor.train_model()
+
+
+def load_and_train(name, predictor, get_training_data_func, incremental=False):
+    """Pobranie danych treningowych i trening jednego predyktora; zwraca czasy etapów."""
+    timings = {}
+    with stage(timings, f"load {name}"):
+        training_data = get_training_data_func()
+    with stage(timings, f"fit {name}"):
+        train_predictor(predictor, training_data, incremental)
+    return timings
+
+
+def train_predictors(jobs, incremental=False):
+    """
+    Trenuje niezależne predyktory jednocześnie, każdy w osobnym wątku: zapytanie do bazy
+    i budowa drzew sklearn zwalniają GIL, więc pobieranie danych jednego modelu nakłada się
+    na trening drugiego, a dwa treningi zajmują dwa rdzenie. Więcej rdzeni na jeden model
+    daje backend random_forest_parallel (n_jobs=-1).
+    jobs: lista (nazwa, predyktor, funkcja pobierająca dane treningowe). Zwraca czasy etapów.
+    """
+    timings = {}
+    with ThreadPoolExecutor(max_workers=len(jobs)) as pool:
+        futures = [
+            pool.submit(load_and_train, name, predictor, get_training_data_func, incremental)
+            for name, predictor, get_training_data_func in jobs
+        ]
+        for future in futures:
+            timings.update(future.result())
+    return timings
 
 
 def predict_and_save_data(predictor, get_prediction_data_func, update_method):
@@ -39,11 +115,29 @@ def predict_and_save_data(predictor, get_prediction_data_func, update_method):
     update_method(predictor.df)
 
 
-def save_weather(receiver, fetch_method, db, data_type):
+def predict_chained(energy_predictor, sold_energy_predictor, db, object_id):
+    """
+    Predykcja produkcji, a następnie oddania na ramce zbudowanej w pamięci z prognozy
+    produkcji (bez zapisu i ponownego odczytu z bazy); na końcu jeden zapis obu tabel.
+    """
+    energy_predictor.load_data(db.get_produced_energy_prediction_data(object_id))
+    energy_predictor.predict_missing()
+    energy_predictor.save_pivot()
+
+    sold_energy_predictor.load_data(
+        chained_prediction_data(energy_predictor.df, SOLD_ENERGY_FEATURES)
+    )
+    sold_energy_predictor.predict_missing()
+    sold_energy_predictor.save_pivot()
+
+    db.update_predicted_energy(energy_predictor.df, sold_energy_predictor.df)
+
+
+def save_weather(receiver, fetch_method, db, data_type, object_id=1):
     try:
         data = receiver.filter_complete_days(fetch_method())
         if not data.empty:
-            db.save_weather_data(data, data_type)
+            db.save_weather_data(data, data_type, object_id=object_id)
             logging.info(f"{data_type.capitalize()} weather data saved to database.")
         else:
             logging.info(f"No {data_type} weather data to save.")
@@ -52,96 +146,225 @@ def save_weather(receiver, fetch_method, db, data_type):
         logging.error(f"Error saving {data_type} weather data: {e}")
 
 
-def get_last_weather_date(db, data_type):
+def get_last_weather_date(db, data_type, object_id=1, default=HISTORY_START):
     """Funkcja pomocnicza do pobierania ostatniej daty z bazy danych."""
-    last_date = db.get_latest_weather_date(data_type)
+    last_date = db.get_latest_weather_date(data_type, object_id=object_id)
     if last_date is None:
-        last_date = "2025-03-01"  # Domyślna data, jeśli brak danych
+        last_date = default  # Domyślna data, jeśli brak danych
     return last_date
 
 
-if __name__ == "__main__":
-    db = DBManager(DB_URL)
-    excel_path = r"C:\Users\Użytkownik1\Desktop\python_scripts\energy_production_planner\data\input\production_to_predict.xlsx"
-    db.import_data_from_excel(excel_path, object_id=1, type_value="real")
+def run_site(site, db_url=DB_URL, incremental=False):
+    """
+    Pełny przebieg potoku dla jednego obiektu: pogoda historyczna i prognoza,
+    trening modeli, predykcja i zapis do bazy. Zwraca (object_id, słownik pivotów z site_pivots).
+    Funkcja tworzy własne połączenie z bazą, więc może działać w osobnym procesie.
+    incremental=True aktualizuje zapisane modele przyrostowo zamiast trenować od zera.
+    """
+    db = DBManager(db_url, cache_dir=CACHE_DIR)
+    object_id = site.object_id
+    timings = {}
 
-    last_real_weather_date = get_last_weather_date(db, "real")
+    last_real_weather_date = get_last_weather_date(
+        db, "real", object_id, default=site.history_start
+    )
     today = pd.Timestamp.now(tz="UTC").normalize().strftime("%Y-%m-%d")
-    logging.info("Last real date in database: %s", last_real_weather_date)
+    logging.info(
+        "Last real date in database for object %s: %s", object_id, last_real_weather_date
+    )
+    # backfill zawsze od stałego początku historii do końca ostatniego pełnego miesiąca,
+    # więc granice okien się nie zmieniają, a okna nieudane są ponawiane przy kolejnym
+    # uruchomieniu; dni nowsze pobierane są od ostatniej zapisanej daty
+    backfill_end = complete_windows_end(today, BACKFILL_AFTER_DAYS)
+    recent_start = max(
+        pd.Timestamp(last_real_weather_date),
+        pd.Timestamp(site.history_start),
+        pd.Timestamp(backfill_end) + pd.Timedelta(days=1),
+    ).strftime("%Y-%m-%d")
 
     historical_receiver = HistoricalWeatherDataReceiver(
-        latitude=LATITUDE,
-        longitude=LONGITUDE,
+        latitude=site.latitude,
+        longitude=site.longitude,
         output_file=HISTORICAL_FILE,
-        start_date=last_real_weather_date,
+        start_date=recent_start,
         end_date=today,
     )
 
     forecast_receiver = ForecastWeatherDataReceiver(
-        latitude=LATITUDE,
-        longitude=LONGITUDE,
+        latitude=site.latitude,
+        longitude=site.longitude,
         output_file=FORECAST_FILE,
         past_days=0,
         forecast_days=10,
     )
 
-    historical_weather = historical_receiver.fetch_historical_data()
-
-    save_weather(
-        historical_receiver, historical_receiver.fetch_historical_data, db, "real"
-    )
-
-    save_weather(
-        forecast_receiver, forecast_receiver.fetch_forecast_data, db, "predicted"
+    with stage(timings, "weather"):
+        backfill = backfill_historical_weather(db, site, site.history_start, backfill_end)
+        unfinished = backfill[backfill["status"] == "failed"]
+        if not unfinished.empty:
+            logging.warning(
+                "Object %s: %d weather backfill windows unfinished, retried on next run: %s",
+                object_id,
+                len(unfinished),
+                ", ".join(
+                    f"{row.window_start} - {row.window_end}"
+                    for row in unfinished.itertuples()
+                ),
+            )
+        save_weather(
+            historical_receiver,
+            historical_receiver.fetch_historical_data,
+            db,
+            "real",
+            object_id,
+        )
+
+        save_weather(
+            forecast_receiver,
+            forecast_receiver.fetch_forecast_data,
+            db,
+            "predicted",
+            object_id,
+        )
+
+    registry = ModelRegistry(MODEL_DIR)
+    lag_options = (
+        {"lags": DEFAULT_LAGS, "rolling_windows": DEFAULT_ROLLING_WINDOWS}
+        if site.lag_features
+        else {}
     )
 
     energy_predictor = EnergyProductionPredictor(
         input_path="data/input/production_to_predict.xlsx",
         output_pred_path="data/input/pv_predicted.xlsx",
-        output_pivot_path="data/output/pv_pivot_db.xlsx",
+        output_pivot_path=f"data/output/pv_pivot_db_{object_id}.xlsx",
+        registry=registry,
+        model_name=f"produced_energy_{object_id}",
+        backend=MODEL_BACKEND,
+        quantiles=PREDICTION_QUANTILES,
+        compact=COMPACT_MODEL,
+        **lag_options,
     )
 
     sold_energy_predictor = SoldEnergyPredictor(
         input_path="data/input/pv_predicted.xlsx",
         output_pred_path="data/output/sold_predicted.xlsx",
-        output_pivot_path="data/output/sold_pivot_db.xlsx",
+        output_pivot_path=f"data/output/sold_pivot_db_{object_id}.xlsx",
+        registry=registry,
+        model_name=f"sold_energy_{object_id}",
+        backend=MODEL_BACKEND,
+        quantiles=PREDICTION_QUANTILES,
+        compact=COMPACT_MODEL,
+        **lag_options,
     )
 
-    energy_production_training_data = db.get_produced_energy_training_data()
-    train_predictor(energy_predictor, energy_production_training_data)
-
-    sold_energy_training_data = db.get_sold_energy_training_data()
-
-    train_predictor(sold_energy_predictor, sold_energy_training_data)
+    # modele są niezależne (oddanie uczy się na rzeczywistej produkcji), więc pobieranie
+    # danych i trening obu biegną równolegle
+    with stage(timings, "training (concurrent)"):
+        timings.update(
+            train_predictors(
+                [
+                    (
+                        "produced",
+                        energy_predictor,
+                        partial(db.get_produced_energy_training_data, object_id),
+                    ),
+                    (
+                        "sold",
+                        sold_energy_predictor,
+                        partial(db.get_sold_energy_training_data, object_id),
+                    ),
+                ],
+                incremental,
+            )
+        )
+
+    with stage(timings, "prediction"):
+        db.clear_predicted_rows(object_id=object_id)
+        db.insert_empty_predicted_rows(object_id=object_id)
+
+        if CHAIN_PREDICTIONS:
+            predict_chained(energy_predictor, sold_energy_predictor, db, object_id)
+        else:
+            predict_and_save_data(
+                energy_predictor,
+                partial(db.get_produced_energy_prediction_data, object_id),
+                db.update_predicted_produced_energy,
+            )
+
+            predict_and_save_data(
+                sold_energy_predictor,
+                partial(db.get_sold_energy_prediction_data, object_id),
+                db.update_predicted_sold_energy,
+            )
+
+    logging.info("Object %s stage times: %s", object_id, format_timings(timings))
+    return object_id, site_pivots(energy_predictor, sold_energy_predictor)
+
+
+def site_pivots(energy_predictor, sold_energy_predictor):
+    """Pivoty prognozy punktowej i przedziałów: nazwa arkusza (bez obiektu) -> DataFrame."""
+    pivots = {}
+    for name, predictor in (("wyprodukowana", energy_predictor), ("oddana", sold_energy_predictor)):
+        pivots[name] = predictor.return_pivot()
+        for quantile in PREDICTION_QUANTILES:
+            band = band_name(quantile)
+            pivots[f"{name}_{band}"] = predictor.return_pivot(band)
+    return pivots
+
+
+def run_sites(sites, db_url=DB_URL, max_workers=None, incremental=False):
+    """
+    Uruchamia run_site dla wszystkich obiektów w puli procesów (domyślnie tylu,
+    ile rdzeni). Błąd jednego obiektu nie przerywa pozostałych.
+    Zwraca słownik pivotów: nazwa arkusza -> DataFrame.
+    """
+    pivots = {}
+    with ProcessPoolExecutor(max_workers=max_workers) as pool:
+        futures = {pool.submit(run_site, site, db_url, incremental): site for site in sites}
+        for future in as_completed(futures):
+            site = futures[future]
+            try:
+                object_id, object_pivots = future.result()
+            except Exception as e:
+                logging.error(f"Error processing object {site.object_id}: {e}")
+                continue
+            for name, pivot in object_pivots.items():
+                pivots[f"{name}_{object_id}"] = pivot
+    return dict(sorted(pivots.items()))
 
-    db.clear_predicted_rows()
-    db.insert_empty_predicted_rows(object_id=1)
 
-    predict_and_save_data(
-        energy_predictor,
-        db.get_produced_energy_prediction_data,
-        db.update_predicted_produced_energy,
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Prognoza produkcji i oddania energii.")
+    parser.add_argument(
+        "--sites",
+        help="plik JSON z rejestrem obiektów (object_id, latitude, longitude); "
+        "bez tej opcji przetwarzany jest tylko obiekt 1",
     )
-
-    predict_and_save_data(
-        sold_energy_predictor,
-        db.get_sold_energy_prediction_data,
-        db.update_predicted_sold_energy,
+    parser.add_argument(
+        "--workers", type=int, default=None, help="liczba procesów dla trybu wielu obiektów"
     )
-
-    produced_pivot = energy_predictor.return_pivot()
-    sold_pivot = sold_energy_predictor.return_pivot()
-
-    save_pivots_to_excel(
-        {
-            "energia_wyprodukowana": produced_pivot,
-            "energia_oddana": sold_pivot,
-        },
-        "data/output/predictions_pivot.xlsx",
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="aktualizuj zapisane modele przyrostowo (co kilka aktualizacji pełny trening)",
     )
+    args = parser.parse_args()
 
-gui = TableWithTabs(db_manager=db)
-gui.mainloop()
-
-
-# Załóżmy, że df to Twój DataFrame z danymi pogodowymi
+    db = DBManager(DB_URL)
+    db.ensure_schema()
+
+    if args.sites:
+        pivots = run_sites(
+            load_sites(args.sites), DB_URL, args.workers, args.incremental
+        )
+    else:
+        excel_path = r"C:\Users\Użytkownik1\Desktop\python_scripts\energy_production_planner\data\input\production_to_predict.xlsx"
+        db.import_data_from_excel(excel_path, object_id=1, type_value="real")
+        _, site_pivot_dict = run_site(DEFAULT_SITE, incremental=args.incremental)
+        pivots = {f"energia_{name}": pivot for name, pivot in site_pivot_dict.items()}
+
+    save_pivots_to_excel(pivots, "data/output/predictions_pivot.xlsx")
+
+    gui = TableWithTabs(db_manager=db)
+    gui.mainloop()
@@ -0,0 +1,29 @@
+from sklearn.ensemble import HistGradientBoostingRegressor, RandomForestRegressor
+
+# nazwa backendu -> (klasa estymatora, parametry domyślne)
+MODEL_BACKENDS = {
+    "random_forest": (
+        RandomForestRegressor,
+        {"n_estimators": 100, "random_state": 42},
+    ),
+    "random_forest_parallel": (
+        RandomForestRegressor,
+        {"n_estimators": 100, "random_state": 42, "n_jobs": -1},
+    ),
+    "hist_gradient_boosting": (
+        HistGradientBoostingRegressor,
+        {"random_state": 42},
+    ),
+}
+
+DEFAULT_BACKEND = "random_forest"
+
+
+def create_estimator(backend=DEFAULT_BACKEND, params=None):
+    """Tworzy estymator dla wskazanego backendu; params nadpisują parametry domyślne."""
+    if backend not in MODEL_BACKENDS:
+        raise ValueError(
+            f"Nieznany backend modelu: {backend}. Dostępne: {', '.join(MODEL_BACKENDS)}"
+        )
+    estimator_cls, defaults = MODEL_BACKENDS[backend]
+    return estimator_cls(**{**defaults, **(params or {})})
@@ -0,0 +1,125 @@
+import hashlib
+import json
+import os
+
+import joblib
+import pandas as pd
+
+from compact_forest import CompactForest
+
+
+def data_fingerprint(df, columns):
+    """
+    Odcisk danych treningowych: liczba wierszy, największa data, największa godzina tej
+    daty (max_hour, jeśli jest kolumna hour) i skrót zawartości. Wiersze są sortowane
+    przed liczeniem skrótu, więc kolejność z zapytania nie ma znaczenia.
+    """
+    data = df[columns].sort_values(columns).reset_index(drop=True)
+    content_hash = hashlib.sha256(
+        pd.util.hash_pandas_object(data, index=False).values.tobytes()
+    ).hexdigest()
+    max_date = df["date"].max() if "date" in df.columns and not df.empty else None
+    max_hour = None
+    if max_date is not None and "hour" in df.columns:
+        max_hour = int(df.loc[df["date"] == max_date, "hour"].max())
+    return {"rows": len(df), "max_date": str(max_date), "max_hour": max_hour, "hash": content_hash}
+
+
+class ModelRegistry:
+    """
+    Przechowuje wytrenowane modele na dysku (joblib, kompresja) razem z listą cech,
+    metrykami i odciskiem danych treningowych - jeden plik .joblib i .json na nazwę modelu.
+    """
+
+    def __init__(self, registry_dir="models", compress=3):
+        self.registry_dir = registry_dir
+        self.compress = compress
+        os.makedirs(registry_dir, exist_ok=True)
+
+    def _tuned_path(self, name):
+        return os.path.join(self.registry_dir, f"{name}.tuned.json")
+
+    def load_tuned_config(self, name):
+        """Najlepsza konfiguracja z tuningu ({"backend", "params", ...}) lub None."""
+        path = self._tuned_path(name)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def save_tuned_config(self, name, config):
+        path = self._tuned_path(name)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(config, f, indent=2)
+        os.replace(f"{path}.tmp", path)
+
+    def _paths(self, name):
+        base = os.path.join(self.registry_dir, name)
+        return f"{base}.joblib", f"{base}.json"
+
+    def _compact_path(self, name):
+        return os.path.join(self.registry_dir, f"{name}.compact.npz")
+
+    def load_metadata(self, name):
+        _, meta_path = self._paths(name)
+        if not os.path.exists(meta_path):
+            return None
+        with open(meta_path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def load(self, name, fingerprint, features, config=None, compact=None):
+        """
+        Zwraca (model, metadane), jeśli zapisany model powstał na tych samych danych,
+        cechach i konfiguracji estymatora; w przeciwnym razie None.
+        compact: opcje przycięcia (CompactForest.from_sklearn) - jeśli zapisano las w tej
+        postaci z tymi opcjami, zwracany jest on zamiast modelu sklearn.
+        """
+        meta = self.load_metadata(name)
+        if meta is None:
+            return None
+        if (
+            meta["fingerprint"] != fingerprint
+            or meta["features"] != list(features)
+            or meta.get("config") != config
+        ):
+            return None
+        compact_path = self._compact_path(name)
+        if compact is not None and meta.get("compact") == compact and os.path.exists(compact_path):
+            return CompactForest.load(compact_path), meta
+        model_path, _ = self._paths(name)
+        return joblib.load(model_path), meta
+
+    def load_latest(self, name, features, config=None):
+        """
+        Zwraca (model, metadane) ostatnio zapisanego modelu o tych samych cechach
+        i konfiguracji, niezależnie od danych treningowych - punkt wyjścia treningu przyrostowego.
+        """
+        meta = self.load_metadata(name)
+        if meta is None or meta["features"] != list(features) or meta.get("config") != config:
+            return None
+        model_path, _ = self._paths(name)
+        return joblib.load(model_path), meta
+
+    def save(self, name, model, features, metrics, fingerprint, config=None, extra=None, compact_model=None):
+        """compact_model: CompactForest zapisywany obok modelu sklearn (szybkie wczytanie)."""
+        model_path, meta_path = self._paths(name)
+        joblib.dump(model, f"{model_path}.tmp", compress=self.compress)
+        os.replace(f"{model_path}.tmp", model_path)
+        compact_path = self._compact_path(name)
+        if compact_model is not None:
+            compact_model.save(compact_path.replace(".npz", ".tmp.npz"))
+            os.replace(compact_path.replace(".npz", ".tmp.npz"), compact_path)
+        elif os.path.exists(compact_path):
+            os.remove(compact_path)
+        meta = {
+            "features": list(features),
+            "metrics": metrics,
+            "fingerprint": fingerprint,
+            "config": config,
+            "model_size_bytes": os.path.getsize(model_path),
+            **(extra or {}),
+        }
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(meta, f, indent=2)
+        os.replace(f"{meta_path}.tmp", meta_path)
+        return meta
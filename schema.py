@@ -0,0 +1,316 @@
+"""
+Schemat bazy danych i wersjonowane migracje.
+Każda migracja to (wersja, opis, lista poleceń SQL lub słownik układ -> lista);
+DBManager.ensure_schema() wykonuje brakujące migracje po kolei i zapisuje je
+w tabeli schema_migrations.
+"""
+
+PIPELINE_TABLES = ("weather", "produced_energy", "sold_energy")
+
+CREATE_SCHEMA_MIGRATIONS = """
+CREATE TABLE IF NOT EXISTS schema_migrations (
+    version INTEGER PRIMARY KEY,
+    description TEXT NOT NULL,
+    applied_at TIMESTAMPTZ NOT NULL DEFAULT now()
+)
+"""
+
+# blokada chroniąca przed równoległym wykonaniem migracji (oraz tworzenia i usuwania
+# partycji miesięcznych) przez kilka procesów
+LOCK_SCHEMA_MIGRATIONS = "SELECT pg_advisory_xact_lock(724211)"
+
+IS_MIGRATION_APPLIED = """
+SELECT EXISTS (SELECT 1 FROM schema_migrations WHERE version = :version)
+"""
+
+RECORD_MIGRATION = """
+INSERT INTO schema_migrations (version, description)
+VALUES (:version, :description)
+"""
+
+GET_SCHEMA_VERSION = """
+SELECT COALESCE(MAX(version), 0) FROM schema_migrations
+"""
+
+CREATE_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS weather (
+        id SERIAL PRIMARY KEY,
+        date DATE NOT NULL,
+        hour SMALLINT NOT NULL,
+        temp REAL,
+        cloud REAL,
+        gti REAL,
+        type VARCHAR(16) NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS produced_energy (
+        id SERIAL PRIMARY KEY,
+        date DATE NOT NULL,
+        hour SMALLINT NOT NULL,
+        produced_energy DOUBLE PRECISION,
+        type VARCHAR(16) NOT NULL,
+        object_id INTEGER NOT NULL
+    )
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sold_energy (
+        id SERIAL PRIMARY KEY,
+        date DATE NOT NULL,
+        hour SMALLINT NOT NULL,
+        sold_energy DOUBLE PRECISION,
+        type VARCHAR(16) NOT NULL,
+        object_id INTEGER
+    )
+    """,
+]
+
+# klucze wykorzystywane przez klauzule ON CONFLICT
+CREATE_UNIQUE_KEYS = [
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS weather_date_hour_type_key
+    ON weather (date, hour, type)
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS produced_energy_date_hour_type_object_key
+    ON produced_energy (date, hour, type, object_id)
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS sold_energy_date_hour_type_object_key
+    ON sold_energy (date, hour, type, object_id)
+    """,
+]
+
+# Opcjonalny układ partycjonowany: najpierw LIST po type (dane rzeczywiste i prognozy
+# w osobnych gałęziach), potem RANGE po date z partycjami miesięcznymi. Kluczem zakresu
+# jest kolumna date, po której filtrują i łączą wszystkie zapytania potoku.
+# Partycje miesięczne tworzy DBManager.ensure_partitions().
+PARTITIONED_TYPES = ("real", "predicted")
+
+CREATE_PARTITIONED_TABLES = [
+    """
+    CREATE TABLE IF NOT EXISTS weather (
+        id BIGSERIAL,
+        date DATE NOT NULL,
+        hour SMALLINT NOT NULL,
+        temp REAL,
+        cloud REAL,
+        gti REAL,
+        type VARCHAR(16) NOT NULL
+    ) PARTITION BY LIST (type)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS produced_energy (
+        id BIGSERIAL,
+        date DATE NOT NULL,
+        hour SMALLINT NOT NULL,
+        produced_energy DOUBLE PRECISION,
+        type VARCHAR(16) NOT NULL,
+        object_id INTEGER NOT NULL
+    ) PARTITION BY LIST (type)
+    """,
+    """
+    CREATE TABLE IF NOT EXISTS sold_energy (
+        id BIGSERIAL,
+        date DATE NOT NULL,
+        hour SMALLINT NOT NULL,
+        sold_energy DOUBLE PRECISION,
+        type VARCHAR(16) NOT NULL,
+        object_id INTEGER
+    ) PARTITION BY LIST (type)
+    """,
+] + [
+    f"""
+    CREATE TABLE IF NOT EXISTS {table}_{type_value}
+    PARTITION OF {table} FOR VALUES IN ('{type_value}')
+    PARTITION BY RANGE (date)
+    """
+    for table in PIPELINE_TABLES
+    for type_value in PARTITIONED_TYPES
+] + [
+    # pozostałe typy (np. dane testowe) trafiają do niepartycjonowanej gałęzi domyślnej
+    f"""
+    CREATE TABLE IF NOT EXISTS {table}_other PARTITION OF {table} DEFAULT
+    """
+    for table in PIPELINE_TABLES
+] + CREATE_UNIQUE_KEYS
+
+CREATE_MONTH_PARTITION = """
+CREATE TABLE IF NOT EXISTS {partition} PARTITION OF {parent}
+FOR VALUES FROM ('{start}') TO ('{end}')
+"""
+
+IS_PARTITIONED_LAYOUT = """
+SELECT EXISTS (
+    SELECT 1
+    FROM pg_partitioned_table pt
+    JOIN pg_class c ON c.oid = pt.partrelid
+    WHERE c.relname = 'weather'
+)
+"""
+
+GET_CHILD_PARTITIONS = """
+SELECT c.relname
+FROM pg_inherits i
+JOIN pg_class c ON c.oid = i.inhrelid
+JOIN pg_class p ON p.oid = i.inhparent
+WHERE p.relname = :parent
+"""
+
+DETACH_PARTITION = "ALTER TABLE {parent} DETACH PARTITION {partition}"
+
+DROP_PARTITION = "DROP TABLE {partition}"
+
+CREATE_PIPELINE_INDEXES = [
+    # złączenia z pogodą po (type, date, hour) bez sięgania do tabeli
+    """
+    CREATE INDEX IF NOT EXISTS weather_type_date_hour_cov
+    ON weather (type, date, hour) INCLUDE (temp, cloud, gti)
+    """,
+    # dane treningowe: filtr po obiekcie i typie, złączenie po (date, hour)
+    """
+    CREATE INDEX IF NOT EXISTS produced_energy_object_type_date_hour_cov
+    ON produced_energy (object_id, type, date, hour) INCLUDE (produced_energy)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS sold_energy_object_type_date_hour_cov
+    ON sold_energy (object_id, type, date, hour) INCLUDE (sold_energy)
+    """,
+    # dane do predykcji: tylko puste rekordy prognozy
+    """
+    CREATE INDEX IF NOT EXISTS produced_energy_predicted_missing
+    ON produced_energy (object_id, date, hour)
+    WHERE type = 'predicted' AND produced_energy IS NULL
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS sold_energy_predicted_missing
+    ON sold_energy (object_id, date, hour)
+    WHERE type = 'predicted' AND sold_energy IS NULL
+    """,
+    "ANALYZE weather",
+    "ANALYZE produced_energy",
+    "ANALYZE sold_energy",
+]
+
+# pogoda dla wielu obiektów: każdy obiekt ma własne współrzędne, więc dane pogodowe
+# są kluczowane dodatkowo po object_id (istniejące rekordy przypisywane są obiektowi 1)
+ADD_WEATHER_OBJECT_ID = [
+    """
+    ALTER TABLE weather ADD COLUMN IF NOT EXISTS object_id INTEGER NOT NULL DEFAULT 1
+    """,
+    """
+    CREATE UNIQUE INDEX IF NOT EXISTS weather_date_hour_type_object_key
+    ON weather (date, hour, type, object_id)
+    """,
+    # stary klucz mógł powstać jako ograniczenie UNIQUE o tej samej nazwie
+    "ALTER TABLE weather DROP CONSTRAINT IF EXISTS weather_date_hour_type_key",
+    "DROP INDEX IF EXISTS weather_date_hour_type_key",
+    """
+    CREATE INDEX IF NOT EXISTS weather_object_type_date_hour_cov
+    ON weather (object_id, type, date, hour) INCLUDE (temp, cloud, gti)
+    """,
+    "DROP INDEX IF EXISTS weather_type_date_hour_cov",
+    "ANALYZE weather",
+]
+
+# przedziały prognozy (kwantyle z drzew lasu) zapisywane obok wartości punktowej:
+# kolumny <cel>_p10, <cel>_p50, <cel>_p90
+PREDICTION_BANDS = ("p10", "p50", "p90")
+
+ADD_PREDICTION_BAND_COLUMNS = [
+    f"ALTER TABLE {table} ADD COLUMN IF NOT EXISTS {table}_{band} DOUBLE PRECISION"
+    for table in ("produced_energy", "sold_energy")
+    for band in PREDICTION_BANDS
+]
+
+# postęp backfillu historycznej pogody: okna (obiekt, zakres dat) zapisane już w weather
+CREATE_WEATHER_BACKFILL = [
+    """
+    CREATE TABLE IF NOT EXISTS weather_backfill (
+        object_id INTEGER NOT NULL,
+        window_start DATE NOT NULL,
+        window_end DATE NOT NULL,
+        rows INTEGER NOT NULL,
+        completed_at TIMESTAMPTZ NOT NULL DEFAULT now(),
+        PRIMARY KEY (object_id, window_start, window_end)
+    )
+    """,
+]
+
+# dziennik zmian danych rzeczywistych: każdy zapis do weather, produced_energy
+# i sold_energy odnotowuje najwcześniejszą zmienioną datę obiektu; cache danych
+# treningowych (TrainingDataCache) cofa na tej podstawie swój watermark
+CREATE_DATA_CHANGES = [
+    """
+    CREATE TABLE IF NOT EXISTS data_changes (
+        id BIGSERIAL PRIMARY KEY,
+        table_name VARCHAR(32) NOT NULL,
+        object_id INTEGER NOT NULL,
+        min_date DATE NOT NULL,
+        changed_at TIMESTAMPTZ NOT NULL DEFAULT now()
+    )
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS data_changes_object_table_id
+    ON data_changes (object_id, table_name, id)
+    """,
+]
+
+# identyfikator transakcji zapisu w dzienniku zmian: id z sekwencji przydzielane jest
+# przed zatwierdzeniem, więc zmiana o niższym id może stać się widoczna dopiero po
+# odczycie dziennika; xact_id porównywany z xmin migawki odczytu (pg_current_snapshot)
+# obejmuje wszystkie transakcje niezakończone w chwili odczytu
+ADD_DATA_CHANGES_XACT_ID = [
+    """
+    ALTER TABLE data_changes ADD COLUMN IF NOT EXISTS xact_id BIGINT NOT NULL
+    DEFAULT (pg_current_xact_id()::text::bigint)
+    """,
+    """
+    CREATE INDEX IF NOT EXISTS data_changes_object_table_xact
+    ON data_changes (object_id, table_name, xact_id)
+    """,
+]
+
+# polecenia migracji mogą zależeć od układu przechowywania ("plain" lub "partitioned")
+MIGRATIONS = [
+    (
+        1,
+        "tabele weather, produced_energy, sold_energy z kluczami unikalnymi",
+        {
+            "plain": CREATE_TABLES + CREATE_UNIQUE_KEYS,
+            "partitioned": CREATE_PARTITIONED_TABLES,
+        },
+    ),
+    (2, "indeksy pokrywające i częściowe pod zapytania potoku", CREATE_PIPELINE_INDEXES),
+    (3, "kolumna object_id w tabeli weather", ADD_WEATHER_OBJECT_ID),
+    (4, "kolumny przedziałów prognozy P10/P50/P90", ADD_PREDICTION_BAND_COLUMNS),
+    (5, "tabela postępu backfillu pogody weather_backfill", CREATE_WEATHER_BACKFILL),
+    (6, "dziennik zmian danych rzeczywistych data_changes", CREATE_DATA_CHANGES),
+    (7, "identyfikator transakcji w dzienniku zmian data_changes", ADD_DATA_CHANGES_XACT_ID),
+]
+
+def migration_statements(statements, layout):
+    if isinstance(statements, dict):
+        return statements[layout]
+    return statements
+
+
+def month_partition_name(parent, month_start):
+    return f"{parent}_{month_start:%Y_%m}"
+
+
+def collect_plan_scans(plan):
+    """
+    Przechodzi drzewo planu z EXPLAIN (FORMAT JSON) i zwraca listę
+    (typ węzła, tabela, indeks) dla wszystkich węzłów odczytujących tabele.
+    """
+    scans = []
+    # Bitmap Index Scan ma nazwę indeksu, ale tabelę podaje dopiero nadrzędny Bitmap Heap Scan
+    if "Relation Name" in plan or "Index Name" in plan:
+        scans.append(
+            (plan["Node Type"], plan.get("Relation Name"), plan.get("Index Name"))
+        )
+    for child in plan.get("Plans", []):
+        scans.extend(collect_plan_scans(child))
+    return scans
@@ -0,0 +1,58 @@
+"""
+Pomiar czasu normalizacji czasu odbiorników pogody (timezones) względem wcześniejszej
+implementacji wierszowej na wieloletnich szeregach godzinowych. Poprawność godzin
+wokół zmian czasu sprawdzają testy tests/test_timezones.py.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m scripts.benchmark_timezones [--years 10] [--repeats 3]
+"""
+import argparse
+import time
+
+import numpy as np
+import pandas as pd
+
+from timezones import TIMEZONE, local_wall_time
+
+
+def legacy_local_wall_time(utc_series):
+    """Poprzednia ścieżka prognozy: konwersja z awaryjnym apply po wierszach."""
+    converted = utc_series.dt.tz_localize("UTC").apply(
+        lambda ts: pd.NaT if pd.isna(ts) else ts.tz_convert(TIMEZONE)
+    )
+    return pd.to_datetime(converted.map(lambda ts: ts.tz_localize(None) if pd.notna(ts) else pd.NaT))
+
+
+def timed(func, repeats):
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = func()
+        times.append(time.perf_counter() - start)
+    return result, min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--years", type=int, default=10)
+    parser.add_argument("--repeats", type=int, default=3)
+    args = parser.parse_args()
+
+    utc = pd.Series(
+        pd.date_range("2015-01-01", periods=args.years * 8766, freq="h")
+    )
+    print(f"Szereg godzinowy: {len(utc)} wierszy ({args.years} lat)")
+    for name, new, legacy in (
+        ("czas lokalny (prognoza i archiwum)", local_wall_time, legacy_local_wall_time),
+    ):
+        result, new_time = timed(lambda: new(utc), args.repeats)
+        reference, legacy_time = timed(lambda: legacy(utc), 1)
+        same = np.array_equal(result.to_numpy(), reference.to_numpy())
+        print(
+            f"{name}: wektorowo {new_time:.3f} s, wierszowo {legacy_time:.3f} s "
+            f"({legacy_time / new_time:.0f}x), wyniki zgodne: {same}"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+"""
+Lokalny zastępnik API Open-Meteo (/v1/forecast i /v1/archive) do testów i benchmarków
+bez sieci. Odpowiedzi to FlatBuffers z prefiksem długości (format=flatbuffers), zgodne
+z openmeteo_requests: jedna wiadomość WeatherApiResponse na lokalizację (współrzędne
+po przecinku), dane godzinowe deterministyczne dla współrzędnych i czasu.
+
+Konfiguracja: latency - opóźnienie odpowiedzi w sekundach, error_rate - odsetek zapytań
+kończonych kodem 502 (ponawianych przez retry_requests), horizon_days - maksymalna
+liczba dni prognozy.
+
+Uruchomienie z katalogu głównego projektu:
+    python -m scripts.openmeteo_stub_server [--port 8765] [--latency 0.05]
+        [--error-rate 0.1] [--horizon-days 16]
+Odbiorniki kieruje się na serwer przez API_URL, np. http://127.0.0.1:8765/v1/forecast.
+"""
+import argparse
+import random
+import threading
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import flatbuffers
+import numpy as np
+import pandas as pd
+from openmeteo_sdk.Unit import Unit
+from openmeteo_sdk.Variable import Variable
+
+# zmienna "hourly" -> (Variable, Unit) z openmeteo_sdk
+HOURLY_VARIABLES = {
+    "temperature_2m": (Variable.temperature, Unit.celsius),
+    "cloud_cover": (Variable.cloud_cover, Unit.percentage),
+    "global_tilted_irradiance": (Variable.global_tilted_irradiance, Unit.watt_per_square_metre),
+    "global_tilted_irradiance_instant": (
+        Variable.global_tilted_irradiance_instant,
+        Unit.watt_per_square_metre,
+    ),
+}
+
+# numery pól tabel schematu Open-Meteo (kolejność jak w czytnikach openmeteo_sdk)
+RESPONSE_LATITUDE, RESPONSE_LONGITUDE, RESPONSE_UTC_OFFSET = 0, 1, 6
+RESPONSE_TIMEZONE, RESPONSE_HOURLY = 7, 11
+TIME_START, TIME_END, TIME_INTERVAL, TIME_VARIABLES = 0, 1, 2, 3
+VALUES_VARIABLE, VALUES_UNIT, VALUES_VALUES = 0, 1, 3
+
+
+def synthetic_values(name, times, latitude, longitude):
+    """Deterministyczny przebieg zmiennej dla chwil times (sekundy UTC) i lokalizacji."""
+    hours = times / 3600.0
+    day_phase = 2 * np.pi * (hours % 24) / 24
+    year_phase = 2 * np.pi * (hours % 8766) / 8766
+    seed = np.sin(latitude * 12.9898 + longitude * 78.233 + hours * 0.618)
+    if name == "temperature_2m":
+        values = 8 - 10 * np.cos(year_phase) - 4 * np.cos(day_phase) + 2 * seed
+    elif name == "cloud_cover":
+        values = 50 + 45 * seed
+    else:
+        values = np.maximum(0.0, -np.cos(day_phase)) * (700 - 300 * np.cos(year_phase)) * (
+            1 - 0.3 * (seed + 1) / 2
+        )
+    return values.astype(np.float32)
+
+
+def _hourly_table(builder, variables, times, latitude, longitude):
+    tables = []
+    for name in variables:
+        values = synthetic_values(name, times, latitude, longitude)
+        vector = builder.CreateNumpyVector(values)
+        variable, unit = HOURLY_VARIABLES[name]
+        builder.StartObject(13)
+        builder.PrependUint8Slot(VALUES_VARIABLE, variable, 0)
+        builder.PrependUint8Slot(VALUES_UNIT, unit, 0)
+        builder.PrependUOffsetTRelativeSlot(VALUES_VALUES, vector, 0)
+        tables.append(builder.EndObject())
+    builder.StartVector(4, len(tables), 4)
+    for table in reversed(tables):
+        builder.PrependUOffsetTRelative(table)
+    variables_vector = builder.EndVector()
+    builder.StartObject(4)
+    builder.PrependInt64Slot(TIME_START, int(times[0]) if len(times) else 0, 0)
+    builder.PrependInt64Slot(TIME_END, int(times[-1]) + 3600 if len(times) else 0, 0)
+    builder.PrependInt32Slot(TIME_INTERVAL, 3600, 0)
+    builder.PrependUOffsetTRelativeSlot(TIME_VARIABLES, variables_vector, 0)
+    return builder.EndObject()
+
+
+def encode_response(variables, times, latitude, longitude, timezone, utc_offset_seconds):
+    """Jedna wiadomość WeatherApiResponse z prefiksem długości."""
+    builder = flatbuffers.Builder(1024 + len(times) * len(variables) * 4)
+    hourly = _hourly_table(builder, variables, times, latitude, longitude)
+    timezone_name = builder.CreateString(timezone)
+    builder.StartObject(15)
+    builder.PrependFloat32Slot(RESPONSE_LATITUDE, latitude, 0)
+    builder.PrependFloat32Slot(RESPONSE_LONGITUDE, longitude, 0)
+    builder.PrependInt32Slot(RESPONSE_UTC_OFFSET, utc_offset_seconds, 0)
+    builder.PrependUOffsetTRelativeSlot(RESPONSE_TIMEZONE, timezone_name, 0)
+    builder.PrependUOffsetTRelativeSlot(RESPONSE_HOURLY, hourly, 0)
+    builder.FinishSizePrefixed(builder.EndObject())
+    return bytes(builder.Output())
+
+
+def hourly_times(start_day, days, timezone):
+    """Godziny (sekundy UTC) od lokalnej północy start_day przez days dni, jak w Open-Meteo."""
+    start = pd.Timestamp(start_day).tz_localize(timezone)
+    end = (pd.Timestamp(start_day) + pd.Timedelta(days=days)).tz_localize(timezone)
+    return np.arange(start.timestamp(), end.timestamp(), 3600, dtype=np.int64)
+
+
+class StubConfig:
+    def __init__(self, latency=0.0, error_rate=0.0, horizon_days=16, seed=0):
+        self.latency = latency
+        self.error_rate = error_rate
+        self.horizon_days = horizon_days
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.requests = 0
+        self.errors = 0
+
+    def should_fail(self):
+        with self.lock:
+            self.requests += 1
+            failed = self.random.random() < self.error_rate
+            self.errors += failed
+            return failed
+
+
+class OpenMeteoStubHandler(BaseHTTPRequestHandler):
+    config = StubConfig()
+
+    def log_message(self, format, *args):
+        pass
+
+    def _send(self, status, body, content_type):
+        self.send_response(status)
+        self.send_header("Content-Type", content_type)
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        url = urlparse(self.path)
+        query = parse_qs(url.query)
+        if self.config.latency:
+            time.sleep(self.config.latency)
+        if self.config.should_fail():
+            self._send(502, b"Bad Gateway", "text/plain")
+            return
+        try:
+            body = self._weather_body(url.path, query)
+        except (KeyError, ValueError) as e:
+            self._send(400, f'{{"error": true, "reason": "{e}"}}'.encode(), "application/json")
+            return
+        self._send(200, body, "application/octet-stream")
+
+    def _weather_body(self, path, query):
+        def values(name):
+            return [v for item in query.get(name, []) for v in item.split(",") if v]
+
+        latitudes = [float(v) for v in values("latitude")]
+        longitudes = [float(v) for v in values("longitude")]
+        if not latitudes or len(latitudes) != len(longitudes):
+            raise ValueError("latitude i longitude muszą mieć tę samą liczbę wartości")
+        variables = values("hourly")
+        timezone = query.get("timezone", ["UTC"])[0]
+        if path.endswith("/archive"):
+            start_day = pd.Timestamp(query["start_date"][0])
+            days = (pd.Timestamp(query["end_date"][0]) - start_day).days + 1
+        elif path.endswith("/forecast"):
+            past_days = int(query.get("past_days", ["0"])[0])
+            forecast_days = min(int(query.get("forecast_days", ["7"])[0]), self.config.horizon_days)
+            today = pd.Timestamp.now(tz=timezone).tz_localize(None).normalize()
+            start_day = today - pd.Timedelta(days=past_days)
+            days = past_days + forecast_days
+        else:
+            raise KeyError(path)
+        times = hourly_times(start_day, max(days, 0), timezone)
+        utc_offset = int(pd.Timestamp.now(tz=timezone).utcoffset().total_seconds())
+        return b"".join(
+            encode_response(variables, times, lat, lon, timezone, utc_offset)
+            for lat, lon in zip(latitudes, longitudes)
+        )
+
+
+def start_server(port=0, latency=0.0, error_rate=0.0, horizon_days=16, seed=0):
+    """
+    Uruchamia serwer w wątku w tle. Zwraca (serwer, adres bazowy, konfiguracja);
+    konfiguracja zlicza zapytania i błędy 502. Zatrzymanie: server.shutdown().
+    """
+    config = StubConfig(latency, error_rate, horizon_days, seed)
+    handler = type("ConfiguredStubHandler", (OpenMeteoStubHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", port), handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_address[1]}", config
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency", type=float, default=0.0)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--horizon-days", type=int, default=16)
+    args = parser.parse_args()
+
+    config = StubConfig(args.latency, args.error_rate, args.horizon_days)
+    handler = type("ConfiguredStubHandler", (OpenMeteoStubHandler,), {"config": config})
+    server = ThreadingHTTPServer(("127.0.0.1", args.port), handler)
+    print(f"Serwer Open-Meteo (stub) na http://127.0.0.1:{args.port}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        print(f"Zapytań: {config.requests}, błędów 502: {config.errors}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,37 @@
+import json
+from dataclasses import dataclass
+
+# pierwszy dzień pogody rzeczywistej pobieranej dla obiektu bez własnego history_start
+HISTORY_START = "2025-03-01"
+
+
+@dataclass(frozen=True)
+class Site:
+    """
+    Instalacja PV: identyfikator obiektu w bazie oraz współrzędne do prognozy pogody.
+    lag_features włącza cechy opóźnione (lag_1, lag_24, średnia z 24 h) i prognozę rekurencyjną.
+    history_start: pierwszy dzień historii pogody obiektu (YYYY-MM-DD), stały początek
+    backfillu pogody.
+    """
+
+    object_id: int
+    latitude: float
+    longitude: float
+    name: str = ""
+    lag_features: bool = False
+    history_start: str = HISTORY_START
+
+
+def load_sites(path):
+    """
+    Wczytuje rejestr obiektów z pliku JSON w postaci listy:
+    [{"object_id": 1, "latitude": 49.6887, "longitude": 21.7706, "name": "...",
+      "lag_features": false, "history_start": "2025-03-01"}, ...]
+    """
+    with open(path, encoding="utf-8") as f:
+        entries = json.load(f)
+    sites = [Site(**entry) for entry in entries]
+    object_ids = [site.object_id for site in sites]
+    if len(object_ids) != len(set(object_ids)):
+        raise ValueError(f"Powtórzony object_id w rejestrze obiektów: {path}")
+    return sites
@@ -1,14 +1,15 @@
 from base_predictor import BasePredictor
+from feature_store import SOLD_ENERGY_FEATURES
 
 class SoldEnergyPredictor(BasePredictor):
-    def __init__(self, input_path, output_pred_path, output_pivot_path):
+    def __init__(self, input_path, output_pred_path, output_pivot_path, **kwargs):
         super().__init__(
             input_path=input_path,
             output_pred_path=output_pred_path,
             output_pivot_path=output_pivot_path,
-            features=["produced_energy", "hour", "is_holiday", "day_of_week", "month"],  # zmień jeśli inne cechy
-            target="sold_energy",
-            pivot_value="sold_energy"
+            feature_set=SOLD_ENERGY_FEATURES,
+            pivot_value="sold_energy",
+            **kwargs,
         )
 
 if __name__ == "__main__":
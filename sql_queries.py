@@ -2,75 +2,47 @@ GET_LATEST_ENERGY_PRODUCTION_DATE = """
 SELECT MAX(date) AS last_real_date
 FROM produced_energy 
 WHERE type = :type_value
+AND object_id = :object_id
 """
 
 GET_LATEST_WEATHER_DATE = """
 SELECT MAX(date) AS last_real_date
 FROM weather
 WHERE type = :type_value
+AND object_id = :object_id
 """
 
 IS_WEATHER_DAY_COMPLETE = """
 SELECT COUNT(*) AS hour_count
 FROM weather
-WHERE date = :date AND type = :type_value
+WHERE date = :date AND type = :type_value AND object_id = :object_id
 """
 
-GET_PRODUCED_ENERGY_TRAINING_DATA = """
+# dane dla zestawu cech (feature_store.FeatureSet): tabela z celem złączona z tabelą cech
+# źródłowych. Trening i predykcja różnią się tylko typem rekordów (:type) oraz tym,
+# czy cel jest znany ({target_filter} = "NOT") - predykaty zostają dosłowne,
+# więc planista może użyć indeksów częściowych dla pustych rekordów prognozy
+GET_FEATURE_DATA = """
 SELECT
-    p.date,
-    p.hour,
-    w.temp,
-    w.cloud,
-    w.gti,
-    p.produced_energy
-FROM produced_energy p
-JOIN weather w
-  ON p.date = w.date AND p.hour = w.hour AND w.type = 'real' AND p.type = 'real'
-WHERE p.produced_energy IS NOT NULL
-AND p.object_id = 1 
-"""
-GET_SOLD_ENERGY_TRAINING_DATA = """
-SELECT
-    s.date,
-    s.hour,
-    p.produced_energy,
-    s.sold_energy
-FROM sold_energy s
-JOIN produced_energy p
-  ON s.date = p.date AND s.hour = p.hour AND p.type = 'real' and s.type = 'real'
-WHERE s.sold_energy IS NOT NULL
-AND s.object_id = 1
+    t.date,
+    t.hour,
+    {source_columns},
+    t.{target},
+    t.type,
+    t.object_id
+FROM {target_table} t
+JOIN {source_table} src
+  ON t.date = src.date AND t.hour = src.hour AND t.object_id = src.object_id
+  AND src.type = :type
+WHERE t.type = :type
+AND t.{target} IS {target_filter} NULL
+AND t.object_id = :object_id
 """
 
-GET_PRODUCED_ENERGY_PREDICTION_DATA = """ 
-SELECT
-    p.date,
-    p.hour,
-    w.temp,
-    w.cloud,
-    w.gti,
-    p.produced_energy,
-    p.type,
-    p.object_id
-FROM produced_energy p
-JOIN weather w
-  ON p.date = w.date AND p.hour = w.hour AND w.type = 'predicted'
-WHERE p.produced_energy IS NULL
-"""
-
-GET_SOLD_ENERGY_PREDICTION_DATA = """
-SELECT
-    s.date,
-    s.hour,
-    p.produced_energy,
-    s.sold_energy,
-    s.type,
-    s.object_id
-FROM sold_energy s
-JOIN produced_energy p
-  ON s.date = p.date AND s.hour = p.hour AND s.type = 'predicted' AND p.type = 'predicted'
-WHERE s.sold_energy IS NULL
+# dopisywane do GET_FEATURE_DATA przy przyrostowym pobieraniu danych treningowych
+FEATURE_DATA_SINCE_FILTER = """AND t.date >= :last_date
+AND src.date >= :last_date
+AND (t.date, t.hour) > (:last_date, :last_hour)
 """
 
 GET_PRODUCED_ENERGY_FOR_DATE = """
@@ -100,37 +72,170 @@ ORDER BY s.hour
 """
 
 INSERT_OR_UPDATE_WEATHER = """
-INSERT INTO weather (date, hour, temp, cloud, gti, type)
-VALUES (:date, :hour, :temp, :cloud, :gti, :type)
-ON CONFLICT (date, hour, type)
+INSERT INTO weather (date, hour, temp, cloud, gti, type, object_id)
+VALUES (:date, :hour, :temp, :cloud, :gti, :type, :object_id)
+ON CONFLICT (date, hour, type, object_id)
 DO UPDATE SET
     temp = EXCLUDED.temp,
     cloud = EXCLUDED.cloud,
     gti = EXCLUDED.gti
 """
 
+COUNT_EXISTING_WEATHER = """
+SELECT COUNT(*)
+FROM weather w
+JOIN unnest(CAST(:dates AS date[]), CAST(:hours AS integer[])) AS k(date, hour)
+  ON w.date = k.date AND w.hour = k.hour
+WHERE w.type = :type AND w.object_id = :object_id
+"""
+
+CREATE_WEATHER_STAGING = """
+CREATE TEMP TABLE weather_staging
+ON COMMIT DROP
+AS SELECT date, hour, temp, cloud, gti, type, object_id FROM weather
+WITH NO DATA
+"""
+
+COUNT_EXISTING_WEATHER_FROM_STAGING = """
+SELECT COUNT(*)
+FROM weather_staging s
+JOIN weather w
+  ON w.date = s.date AND w.hour = s.hour AND w.type = s.type
+  AND w.object_id = s.object_id
+"""
+
+UPSERT_WEATHER_FROM_STAGING = """
+INSERT INTO weather (date, hour, temp, cloud, gti, type, object_id)
+SELECT date, hour, temp, cloud, gti, type, object_id
+FROM weather_staging
+ON CONFLICT (date, hour, type, object_id)
+DO UPDATE SET
+    temp = EXCLUDED.temp,
+    cloud = EXCLUDED.cloud,
+    gti = EXCLUDED.gti
+"""
+
+CREATE_PRODUCED_ENERGY_STAGING = """
+CREATE TEMP TABLE produced_energy_staging
+ON COMMIT DROP
+AS SELECT date, hour, produced_energy, produced_energy_p10, produced_energy_p50, produced_energy_p90, type, object_id
+FROM produced_energy
+WITH NO DATA
+"""
+
+BULK_UPDATE_PRODUCED_ENERGY = """
+UPDATE produced_energy p
+SET produced_energy = s.produced_energy,
+    produced_energy_p10 = s.produced_energy_p10,
+    produced_energy_p50 = s.produced_energy_p50,
+    produced_energy_p90 = s.produced_energy_p90
+FROM produced_energy_staging s
+WHERE p.date = s.date AND p.hour = s.hour AND p.type = s.type AND p.object_id = s.object_id
+"""
+
+# aktualizacja pojedynczej godziny (DBManager.update_predicted_*(bulk=False));
+# klucz (date, hour, type, object_id) - w układzie partycjonowanym date wybiera partycję
 UPDATE_PRODUCED_ENERGY = """
 UPDATE produced_energy
-SET produced_energy = :produced_energy
+SET produced_energy = :produced_energy,
+    produced_energy_p10 = :produced_energy_p10,
+    produced_energy_p50 = :produced_energy_p50,
+    produced_energy_p90 = :produced_energy_p90
 WHERE date = :date AND hour = :hour AND type = :type AND object_id = :object_id
 """
 
 UPDATE_SOLD_ENERGY = """
 UPDATE sold_energy
-SET sold_energy = :sold_energy
+SET sold_energy = :sold_energy,
+    sold_energy_p10 = :sold_energy_p10,
+    sold_energy_p50 = :sold_energy_p50,
+    sold_energy_p90 = :sold_energy_p90
 WHERE date = :date AND hour = :hour AND type = :type AND object_id = :object_id
 """
 
+CREATE_SOLD_ENERGY_STAGING = """
+CREATE TEMP TABLE sold_energy_staging
+ON COMMIT DROP
+AS SELECT date, hour, sold_energy, sold_energy_p10, sold_energy_p50, sold_energy_p90, type, object_id
+FROM sold_energy
+WITH NO DATA
+"""
+
+BULK_UPDATE_SOLD_ENERGY = """
+UPDATE sold_energy s
+SET sold_energy = st.sold_energy,
+    sold_energy_p10 = st.sold_energy_p10,
+    sold_energy_p50 = st.sold_energy_p50,
+    sold_energy_p90 = st.sold_energy_p90
+FROM sold_energy_staging st
+WHERE s.date = st.date AND s.hour = st.hour AND s.type = st.type AND s.object_id = st.object_id
+"""
+
 DELETE_PRODUCED_ENERGY_PREDICTION = """
-DELETE FROM produced_energy WHERE type = 'predicted' AND date >= :from_date
+DELETE FROM produced_energy
+WHERE type = 'predicted' AND date >= :from_date
+AND (CAST(:object_id AS integer) IS NULL OR object_id = :object_id)
 """
 
 DELETE_SOLD_ENERGY_PREDICTION = """
-DELETE FROM sold_energy WHERE type = 'predicted' AND date >= :from_date
+DELETE FROM sold_energy
+WHERE type = 'predicted' AND date >= :from_date
+AND (CAST(:object_id AS integer) IS NULL OR object_id = :object_id)
 """
 
 SELECT_DISTINCT_PREDICTED_WEATHER = """
 SELECT DISTINCT date, hour
 FROM weather
 WHERE type = 'predicted'
-"""
\ No newline at end of file
+AND object_id = :object_id
+"""
+
+CREATE_IMPORT_STAGING = """
+CREATE TEMP TABLE {table}_import
+ON COMMIT DROP
+AS SELECT {columns} FROM {table}
+WITH NO DATA
+"""
+
+INSERT_IGNORE_FROM_IMPORT_STAGING = """
+INSERT INTO {table} ({columns})
+SELECT {columns}
+FROM {table}_import
+ON CONFLICT ({unique_columns}) DO NOTHING
+"""
+
+TRUNCATE_IMPORT_STAGING = """
+TRUNCATE {table}_import
+"""
+
+GET_BACKFILL_WINDOWS = """
+SELECT window_start, window_end
+FROM weather_backfill
+WHERE object_id = :object_id
+"""
+
+RECORD_BACKFILL_WINDOW = """
+INSERT INTO weather_backfill (object_id, window_start, window_end, rows)
+VALUES (:object_id, :window_start, :window_end, :rows)
+ON CONFLICT (object_id, window_start, window_end)
+DO UPDATE SET rows = EXCLUDED.rows, completed_at = now()
+"""
+
+RECORD_DATA_CHANGE = """
+INSERT INTO data_changes (table_name, object_id, min_date)
+VALUES (:table_name, :object_id, :min_date)
+"""
+
+# najwcześniejsza data zmieniona w tabelach zestawu cech przez transakcje, które nie były
+# zakończone przy poprzednim odczycie (xact_id >= :since), oraz xmin bieżącej migawki
+# jako znacznik następnego odczytu; zmiany widoczne już wcześniej mogą zostać
+# zwrócone ponownie, ale żadna zatwierdzona później nie zostanie pominięta
+GET_DATA_CHANGES_SINCE = """
+SELECT
+    pg_snapshot_xmin(pg_current_snapshot())::text::bigint AS marker,
+    MIN(min_date) AS min_date
+FROM data_changes
+WHERE object_id = :object_id
+AND table_name IN (:target_table, :source_table)
+AND xact_id >= :since
+"""
@@ -0,0 +1,56 @@
+import numpy as np
+import pandas as pd
+import pytest
+
+from base_predictor import BasePredictor
+from feature_store import PRODUCED_ENERGY_FEATURES
+from model_registry import ModelRegistry
+
+
+def test_original_positional_signature():
+    predictor = BasePredictor("in.xlsx", "pred.xlsx", "pivot.xlsx", ["hour", "temp"], "y", "y")
+
+    assert predictor.features == ["hour", "temp"]
+    assert predictor.target == "y"
+    assert predictor.pivot_value == "y"
+
+
+def test_feature_set_replaces_features_and_target():
+    predictor = BasePredictor(
+        None, None, None, pivot_value="produced_energy", feature_set=PRODUCED_ENERGY_FEATURES
+    )
+
+    assert predictor.features == list(PRODUCED_ENERGY_FEATURES.features)
+    assert predictor.target == PRODUCED_ENERGY_FEATURES.target
+
+
+def test_missing_features_and_feature_set_raises():
+    with pytest.raises(ValueError, match="features i target albo feature_set"):
+        BasePredictor(None, None, None, pivot_value="y")
+
+
+def hourly_training_data(start, hours):
+    dates = pd.date_range(start, periods=hours, freq="h")
+    rng = np.random.default_rng(0)
+    temp = rng.normal(10, 5, hours)
+    return pd.DataFrame(
+        {"date": dates.date, "hour": dates.hour, "temp": temp, "y": 2 * temp + dates.hour}
+    )
+
+
+def test_update_model_after_partial_last_day_is_incremental(tmp_path):
+    registry = ModelRegistry(str(tmp_path))
+    data = hourly_training_data("2025-06-01", 24 * 5)
+    predictor = BasePredictor(
+        None, None, None, ["hour", "temp"], "y", "y",
+        registry=registry, model_params={"n_estimators": 10},
+    )
+    # ostatni dzień pierwszego treningu wczytany tylko do 11:00
+    predictor.load_data(data.iloc[: 24 * 3 + 12])
+    predictor.train_model()
+
+    predictor.load_data(data)
+    predictor.update_model(new_trees=5, max_trees=20)
+
+    assert [entry["mode"] for entry in predictor.metrics_history] == ["full", "incremental"]
+    assert len(predictor.model.estimators_) == 15
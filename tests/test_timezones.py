@@ -0,0 +1,91 @@
+import pandas as pd
+
+from historical_weather_data_receiver import HistoricalWeatherDataReceiver
+from timezones import TIMEZONE, local_wall_time, to_utc
+from weather_data_receiver import ForecastWeatherDataReceiver
+
+# zmiany czasu 2025 w Europe/Warsaw: 30 marca i 26 października o 01:00 UTC
+MARCH_UTC = pd.Series(pd.date_range("2025-03-29 23:00", periods=4, freq="h"))
+OCTOBER_UTC = pd.Series(pd.date_range("2025-10-25 23:00", periods=4, freq="h"))
+
+
+def index(values):
+    return pd.DatetimeIndex(pd.to_datetime(values))
+
+
+def test_to_utc_naive_values_are_utc_by_default():
+    result = to_utc(MARCH_UTC)
+
+    assert str(result.tz) == "UTC"
+    assert result.tz_localize(None).equals(pd.DatetimeIndex(MARCH_UTC))
+
+
+def test_to_utc_nonexistent_march_local_time_shifts_forward():
+    result = to_utc(pd.Series(pd.to_datetime(["2025-03-30 02:30"])), assume_tz=TIMEZONE)
+
+    # 03:00 czasu letniego = 01:00 UTC
+    assert result.equals(pd.DatetimeIndex(["2025-03-30 01:00"], tz="UTC"))
+
+
+def test_to_utc_ambiguous_october_local_time():
+    values = pd.Series(pd.to_datetime(["2025-10-26 02:30"]))
+
+    assert to_utc(values, assume_tz=TIMEZONE).isna().all()
+    # True - pierwsze wystąpienie (czas letni), False - drugie (czas zimowy)
+    assert to_utc(values, assume_tz=TIMEZONE, ambiguous=[True]).equals(
+        pd.DatetimeIndex(["2025-10-26 00:30"], tz="UTC")
+    )
+    assert to_utc(values, assume_tz=TIMEZONE, ambiguous=[False]).equals(
+        pd.DatetimeIndex(["2025-10-26 01:30"], tz="UTC")
+    )
+
+
+def test_local_wall_time_skips_march_hour():
+    result = local_wall_time(MARCH_UTC)
+
+    assert result.equals(
+        index(["2025-03-30 00:00", "2025-03-30 01:00", "2025-03-30 03:00", "2025-03-30 04:00"])
+    )
+
+
+def test_local_wall_time_repeats_october_hour_for_distinct_utc_hours():
+    result = local_wall_time(OCTOBER_UTC)
+
+    assert result.equals(
+        index(["2025-10-26 01:00", "2025-10-26 02:00", "2025-10-26 02:00", "2025-10-26 03:00"])
+    )
+    assert OCTOBER_UTC.is_unique
+
+
+def test_local_wall_time_local_input_around_transitions():
+    result = local_wall_time(
+        pd.Series(pd.to_datetime(["2025-03-30 02:30", "2025-10-26 02:30"])),
+        assume_tz=TIMEZONE,
+    )
+
+    assert result.equals(index(["2025-03-30 03:00", pd.NaT]))
+
+
+def test_receivers_share_local_time(tmp_path):
+    """Pogoda rzeczywista (archiwum) i prognoza mają te same godziny, także latem."""
+    df = pd.DataFrame({"date": pd.concat([MARCH_UTC, OCTOBER_UTC], ignore_index=True)})
+    forecast = ForecastWeatherDataReceiver(
+        49.7, 21.8, output_file=None, cache_name=str(tmp_path / "forecast")
+    )
+    archive = HistoricalWeatherDataReceiver(
+        49.7, 21.8, "2025-03-29", "2025-10-26", cache_name=str(tmp_path / "archive")
+    )
+
+    pd.testing.assert_frame_equal(
+        archive.shift_hour_dst_only(df), forecast.shift_hour_dst_only(df)
+    )
+    assert archive.shift_hour_dst_only(df)["date"].equals(
+        pd.Series(local_wall_time(df["date"]), name="date")
+    )
+
+
+def test_nat_is_preserved():
+    result = local_wall_time(pd.Series([pd.NaT, pd.Timestamp("2025-07-01 10:00"), "not a date"]))
+
+    assert result.isna().tolist() == [True, False, True]
+    assert result[1].hour == 12
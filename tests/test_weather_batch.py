@@ -0,0 +1,161 @@
+import pandas as pd
+import pytest
+
+from historical_weather_data_receiver import HistoricalWeatherDataReceiver
+from scripts.openmeteo_stub_server import hourly_times, start_server
+from sites import Site
+from timezones import TIMEZONE
+from weather_batch import fetch_sites
+from weather_data_receiver import ForecastWeatherDataReceiver
+
+# kolejność object_id celowo różna od kolejności sortowania wyniku
+SITES = [
+    Site(object_id=object_id, latitude=49.0 + i * 0.25, longitude=19.0 + i * 0.5)
+    for i, object_id in enumerate([5, 3, 9, 1, 7])
+]
+SITES_PER_REQUEST = 2
+FORECAST_DAYS = 3
+# zakres obejmuje zmianę czasu 26 października (dzień o 25 godzinach)
+ARCHIVE_START, ARCHIVE_END = "2025-10-20", "2025-10-31"
+
+
+@pytest.fixture
+def stub():
+    servers = []
+
+    def start(**kwargs):
+        server, base_url, config = start_server(**kwargs)
+        servers.append(server)
+        return base_url, config
+
+    yield start
+    for server in servers:
+        server.shutdown()
+        server.server_close()
+
+
+def forecast_receiver(base_url, tmp_path):
+    receiver = ForecastWeatherDataReceiver(
+        SITES[0].latitude,
+        SITES[0].longitude,
+        output_file=None,
+        past_days=0,
+        forecast_days=FORECAST_DAYS,
+        cache_name=str(tmp_path / "forecast"),
+    )
+    receiver.API_URL = f"{base_url}/v1/forecast"
+    return receiver
+
+
+def archive_receiver(base_url, tmp_path):
+    receiver = HistoricalWeatherDataReceiver(
+        SITES[0].latitude,
+        SITES[0].longitude,
+        start_date=ARCHIVE_START,
+        end_date=ARCHIVE_END,
+        cache_name=str(tmp_path / "archive"),
+    )
+    receiver.API_URL = f"{base_url}/v1/archive"
+    return receiver
+
+
+def fetch_batched(receiver):
+    if isinstance(receiver, ForecastWeatherDataReceiver):
+        return receiver.fetch_forecast_data_for_sites(SITES, sites_per_request=SITES_PER_REQUEST)
+    return receiver.fetch_historical_data_for_sites(SITES, sites_per_request=SITES_PER_REQUEST)
+
+
+def fetch_single(receiver, site):
+    receiver.latitude, receiver.longitude = site.latitude, site.longitude
+    if isinstance(receiver, ForecastWeatherDataReceiver):
+        return receiver.fetch_forecast_data()
+    return receiver.fetch_historical_data()
+
+
+def expected_hours(receiver):
+    if isinstance(receiver, ForecastWeatherDataReceiver):
+        today = pd.Timestamp.now(tz=TIMEZONE).tz_localize(None).normalize()
+        return len(hourly_times(today, FORECAST_DAYS, TIMEZONE))
+    days = (pd.Timestamp(ARCHIVE_END) - pd.Timestamp(ARCHIVE_START)).days + 1
+    return len(hourly_times(ARCHIVE_START, days, TIMEZONE))
+
+
+@pytest.fixture(params=["forecast", "archive"])
+def make_receiver(request, tmp_path):
+    factory = forecast_receiver if request.param == "forecast" else archive_receiver
+    return lambda base_url: factory(base_url, tmp_path)
+
+
+def test_batches_map_rows_to_sites(stub, make_receiver):
+    base_url, config = stub()
+    receiver = make_receiver(base_url)
+
+    df = fetch_batched(receiver)
+
+    # 5 obiektów po 2 w zapytaniu -> 3 zapytania wielolokalizacyjne
+    assert config.requests == 3
+    assert list(df.columns) == ["object_id", "date", *df.columns[2:]]
+    counts = df.groupby("object_id").size()
+    assert sorted(counts.index) == sorted(site.object_id for site in SITES)
+    assert (counts == expected_hours(receiver)).all()
+    for site in SITES:
+        site_df = df[df["object_id"] == site.object_id].drop(columns="object_id")
+        pd.testing.assert_frame_equal(
+            site_df.reset_index(drop=True), fetch_single(receiver, site)
+        )
+
+
+def test_batches_sorted_by_object_and_date(stub, make_receiver):
+    base_url, _ = stub()
+
+    df = fetch_batched(make_receiver(base_url))
+
+    expected = df.sort_values(["object_id", "date"], kind="stable", ignore_index=True)
+    pd.testing.assert_frame_equal(df, expected)
+    assert df["object_id"].is_monotonic_increasing
+    assert df.index.equals(pd.RangeIndex(len(df)))
+
+
+def test_batches_retry_502_through_shared_client(stub, make_receiver):
+    base_url, _ = stub()
+    reference = fetch_batched(make_receiver(base_url))
+    flaky_url, config = stub(error_rate=0.3, seed=7)
+    receiver = make_receiver(flaky_url)
+    receiver.cache_session.cache.clear()
+
+    df = fetch_batched(receiver)
+
+    assert config.errors > 0
+    assert config.requests == 3 + config.errors
+    pd.testing.assert_frame_equal(df, reference)
+
+
+class DroppingClient:
+    """Klient zwracający o jedną odpowiedź mniej, niż było lokalizacji w zapytaniu."""
+
+    def __init__(self, client):
+        self.client = client
+
+    def weather_api(self, url, params):
+        return self.client.weather_api(url, params=params)[:-1]
+
+
+def test_response_count_mismatch_raises(stub, make_receiver):
+    base_url, _ = stub()
+    receiver = make_receiver(base_url)
+    params = {
+        key: value
+        for key, value in receiver.get_api_params().items()
+        if key not in ("latitude", "longitude")
+    }
+
+    with pytest.raises(ValueError, match="odpowiedzi dla 2 lokalizacji"):
+        fetch_sites(
+            DroppingClient(receiver.openmeteo),
+            receiver.API_URL,
+            params,
+            SITES,
+            ["temperature_2m"],
+            receiver._to_local_time,
+            sites_per_request=SITES_PER_REQUEST,
+        )
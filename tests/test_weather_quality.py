@@ -0,0 +1,38 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+from weather_quality import filter_complete_weather_days
+
+
+def weather(object_id, start, hours):
+    dates = pd.date_range(start, periods=hours, freq="h")
+    return pd.DataFrame({"object_id": object_id, "date": dates, "temp": np.ones(hours)})
+
+
+def test_filter_complete_weather_days_per_object_and_logs_report(caplog):
+    df = pd.concat(
+        [weather(1, "2025-06-01", 48), weather(2, "2025-06-01", 30)], ignore_index=True
+    )
+    df.loc[5, "temp"] = np.nan
+
+    with caplog.at_level(logging.INFO, logger="weather_quality"):
+        result = filter_complete_weather_days(df)
+
+    kept = result.groupby("object_id")["date"].agg(lambda d: sorted(set(d.dt.date)))
+    assert kept.to_dict() == {
+        1: [pd.Timestamp("2025-06-02").date()],
+        2: [pd.Timestamp("2025-06-01").date()],
+    }
+    assert "Dropped 2 incomplete weather days" in caplog.text
+    assert "incomplete hours: 1" in caplog.text and "missing values: 1" in caplog.text
+
+
+def test_filter_complete_weather_days_custom_hour_column():
+    df = weather(1, "2025-06-01", 36).drop(columns="object_id").rename(columns={"date": "time"})
+
+    result = filter_complete_weather_days(df, date_col="time")
+
+    assert len(result) == 24
+    assert result["time"].dt.date.nunique() == 1
@@ -0,0 +1,35 @@
+import pandas as pd
+
+TIMEZONE = "Europe/Warsaw"
+
+
+def to_utc(values, assume_tz="UTC", ambiguous="NaT", nonexistent="shift_forward"):
+    """
+    Sprowadza daty (Series, tablicę lub DatetimeIndex) do DatetimeIndex w UTC.
+    Daty bez strefy traktowane są jako czas assume_tz; dla strefy z czasem letnim
+    godzina powtórzona w październiku (ambiguous) i pominięta w marcu (nonexistent)
+    obsługiwane są jawnie według parametrów pandas.tz_localize (domyślnie NaT
+    i przesunięcie na pierwszą istniejącą godzinę). Nieprawidłowe daty -> NaT.
+    """
+    index = pd.DatetimeIndex(pd.to_datetime(values, errors="coerce"))
+    if index.tz is None:
+        index = index.tz_localize(assume_tz, ambiguous=ambiguous, nonexistent=nonexistent)
+    return index.tz_convert("UTC")
+
+
+def utc_offsets(utc_index, timezone=TIMEZONE):
+    """Przesunięcie czasu lokalnego względem UTC (timedelta64) dla każdej daty; NaT dla NaT."""
+    local = utc_index.tz_convert(timezone).tz_localize(None)
+    return (local - utc_index.tz_localize(None)).to_numpy()
+
+
+def local_wall_time(values, timezone=TIMEZONE, **kwargs):
+    """
+    Czas lokalny (bez strefy) w timezone: UTC + pełne przesunięcie. Godzina zmiany czasu
+    w październiku występuje dwa razy (dwie różne godziny UTC), w marcu godziny 2:00 nie ma.
+    Wspólna normalizacja obu odbiorników pogody (prognoza i archiwum).
+    kwargs: assume_tz, ambiguous, nonexistent jak w to_utc.
+    """
+    utc = to_utc(values, **kwargs)
+    return pd.DatetimeIndex(utc.tz_localize(None).to_numpy() + utc_offsets(utc, timezone))
+
@@ -0,0 +1,62 @@
+import datetime
+import json
+import os
+
+import pandas as pd
+
+
+class TrainingDataCache:
+    """
+    Lokalny cache danych treningowych w plikach Parquet - jeden plik na tabelę i obiekt.
+    Obok danych zapisywany jest znacznik (watermark) z największą parą (date, hour),
+    dzięki któremu z bazy pobierane są tylko nowsze rekordy, oraz znacznik dziennika
+    zmian data_changes (change_marker: xmin migawki poprzedniego odczytu).
+    """
+
+    def __init__(self, cache_dir):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _paths(self, table_name, object_id):
+        base = os.path.join(self.cache_dir, f"{table_name}_{object_id}")
+        return f"{base}.parquet", f"{base}.json"
+
+    def load(self, table_name, object_id):
+        """
+        Zwraca (DataFrame, watermark, change_marker) lub (None, None, 0), jeśli cache nie istnieje.
+        """
+        data_path, meta_path = self._paths(table_name, object_id)
+        if not (os.path.exists(data_path) and os.path.exists(meta_path)):
+            return None, None, 0
+        with open(meta_path, encoding="utf-8") as f:
+            meta = json.load(f)
+        last_date, last_hour = meta["watermark"]
+        df = pd.read_parquet(data_path)
+        return df, (datetime.date.fromisoformat(last_date), last_hour), meta.get("change_marker", 0)
+
+    def save(self, table_name, object_id, df, change_marker=0):
+        """Zapisuje pełny DataFrame wraz z nowym znacznikiem i change_marker; zwraca watermark."""
+        if df.empty:
+            return None
+        data_path, meta_path = self._paths(table_name, object_id)
+        last = df.sort_values(["date", "hour"]).iloc[-1]
+        watermark = (last["date"], int(last["hour"]))
+        # zapis przez pliki tymczasowe, żeby przerwanie nie zostawiło niespójnego cache
+        df.to_parquet(f"{data_path}.tmp", index=False)
+        os.replace(f"{data_path}.tmp", data_path)
+        with open(f"{meta_path}.tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "watermark": [watermark[0].isoformat(), watermark[1]],
+                    "rows": len(df),
+                    "change_marker": change_marker,
+                },
+                f,
+            )
+        os.replace(f"{meta_path}.tmp", meta_path)
+        return watermark
+
+    def invalidate(self, table_name, object_id):
+        for path in self._paths(table_name, object_id):
+            if os.path.exists(path):
+                os.remove(path)
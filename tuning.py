@@ -0,0 +1,160 @@
+import hashlib
+import itertools
+import json
+import os
+
+import numpy as np
+import pandas as pd
+from sklearn.metrics import mean_absolute_error, mean_squared_error
+
+from backtesting import fit_predict_fold, make_folds, shared_fold_pool
+from model_registry import data_fingerprint
+
+# przestrzeń przeszukiwania: backend -> parametr -> wartości (pełna siatka)
+PARAM_GRIDS = {
+    "random_forest": {
+        "n_estimators": [100, 200],
+        "max_depth": [None, 12, 20],
+        "min_samples_leaf": [1, 5],
+        "max_features": [1.0, 0.5],
+    },
+    "hist_gradient_boosting": {
+        "learning_rate": [0.05, 0.1],
+        "max_iter": [200, 400],
+        "max_leaf_nodes": [15, 31, 63],
+        "min_samples_leaf": [20, 50],
+    },
+}
+PARAM_GRIDS["random_forest_parallel"] = PARAM_GRIDS["random_forest"]
+
+DEFAULT_CACHE_DIR = os.path.join("models", "tuning_cache")
+
+
+def param_grid(backend):
+    grid = PARAM_GRIDS[backend]
+    return [dict(zip(grid, values)) for values in itertools.product(*grid.values())]
+
+
+def tuning_folds(dates, n_folds=4, fold_days=7, min_train_days=30):
+    """
+    Foldy czasowe o oknach testowych długości fold_days wyrównanych do stałej siatki dni
+    (liczonej od 1970-01-01), kończących się na ostatnim pełnym oknie. Nowy dzień danych
+    nie przesuwa wcześniejszych foldów, więc ich wyniki z cache pozostają ważne.
+    """
+    day_numbers = pd.to_datetime(dates).to_numpy().astype("datetime64[D]").astype(np.int64)
+    last_end = (int(day_numbers.max()) + 1) // fold_days * fold_days
+    first_start = np.datetime64(last_end - n_folds * fold_days, "D")
+    last_start = np.datetime64(last_end - fold_days, "D")
+    return make_folds(
+        dates, first_start, last_start, fold_days, fold_days, min_train_days
+    )
+
+
+class TuningCache:
+    """Wyniki pojedynczych prób (backend, parametry, fold, odcisk danych) w plikach JSON."""
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR):
+        self.cache_dir = cache_dir
+        os.makedirs(cache_dir, exist_ok=True)
+
+    def _path(self, key):
+        digest = hashlib.sha256(json.dumps(key, sort_keys=True).encode()).hexdigest()
+        return os.path.join(self.cache_dir, f"{digest}.json")
+
+    def get(self, key):
+        path = self._path(key)
+        if not os.path.exists(path):
+            return None
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)["metrics"]
+
+    def put(self, key, metrics):
+        path = self._path(key)
+        with open(f"{path}.tmp", "w", encoding="utf-8") as f:
+            json.dump({"key": key, "metrics": metrics}, f)
+        os.replace(f"{path}.tmp", path)
+
+
+def tune(
+    df,
+    features,
+    target,
+    backends=("random_forest",),
+    n_folds=4,
+    fold_days=7,
+    min_train_days=30,
+    cache_dir=DEFAULT_CACHE_DIR,
+    max_workers=None,
+):
+    """
+    Przeszukuje PARAM_GRIDS wskazanych backendów na foldach czasowych (tuning_folds).
+    Próby bez wyniku w cache liczone są równolegle w puli procesów na współdzielonej
+    macierzy cech. Zwraca DataFrame prób posortowany po średnim MAE (najlepsza pierwsza).
+    """
+    data = df[df[target].notna()].sort_values(["date", "hour"], kind="stable")
+    folds = tuning_folds(data["date"], n_folds, fold_days, min_train_days)
+    if not folds:
+        raise ValueError("Za mało danych na foldy tuningu")
+    cache = TuningCache(cache_dir)
+    columns = list(dict.fromkeys(["date", "hour"] + list(features) + [target]))
+    fingerprints = {
+        test_end: data_fingerprint(data.iloc[:test_end], columns)["hash"]
+        for _, _, test_end in folds
+    }
+
+    trials = [
+        (backend, params, fold)
+        for backend in backends
+        for params in param_grid(backend)
+        for fold in folds
+    ]
+    results = {}
+    pending = []
+    for backend, params, (day, train_end, test_end) in trials:
+        key = {
+            "backend": backend,
+            "params": params,
+            "features": list(features),
+            "target": target,
+            "fold": [str(day), fold_days],
+            "data": fingerprints[test_end],
+        }
+        cached = cache.get(key)
+        if cached is not None:
+            results[(backend, json.dumps(params), day)] = cached
+        else:
+            pending.append((key, backend, params, day, train_end, test_end))
+
+    print(f"Tuning {target}: prób {len(trials)}, z cache {len(results)}, do policzenia {len(pending)}")
+    if pending:
+        y = data[target].to_numpy(dtype=np.float64)
+        with shared_fold_pool(data, list(features), target, max_workers) as pool:
+            futures = [
+                pool.submit(fit_predict_fold, train_end, test_end, backend, params)
+                for _, backend, params, _, train_end, test_end in pending
+            ]
+            for (key, backend, params, day, train_end, test_end), future in zip(
+                pending, futures
+            ):
+                y_pred = future.result()
+                y_true = y[train_end:test_end]
+                metrics = {
+                    "mae": float(mean_absolute_error(y_true, y_pred)),
+                    "rmse": float(np.sqrt(mean_squared_error(y_true, y_pred))),
+                }
+                cache.put(key, metrics)
+                results[(backend, json.dumps(params), day)] = metrics
+
+    rows = [
+        {"backend": backend, "params": params_json, "fold": day, **metrics}
+        for (backend, params_json, day), metrics in results.items()
+    ]
+    summary = (
+        pd.DataFrame(rows)
+        .groupby(["backend", "params"], sort=False)
+        .agg(mae=("mae", "mean"), rmse=("rmse", "mean"), folds=("fold", "count"))
+        .sort_values("mae")
+        .reset_index()
+    )
+    summary["params"] = summary["params"].map(json.loads)
+    return summary
@@ -0,0 +1,107 @@
+import logging
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+import pandas as pd
+from pandas.tseries.frequencies import to_offset
+
+from historical_weather_data_receiver import HistoricalWeatherDataReceiver
+
+# okno -> częstotliwość pandas wyznaczająca początki okien
+WINDOW_FREQUENCIES = {"month": "MS", "year": "YS"}
+MAX_WORKERS = 4
+
+logger = logging.getLogger(__name__)
+
+
+def backfill_windows(start_date, end_date, window="month"):
+    """
+    Dzieli zakres [start_date, end_date] na okna wyrównane do miesięcy lub lat
+    kalendarzowych (pierwsze i ostatnie przycięte do zakresu). Zwraca listę (początek, koniec)
+    jako obiekty date; stałe granice okien pozwalają rozpoznać okna już pobrane.
+    """
+    start = pd.Timestamp(start_date).normalize()
+    end = pd.Timestamp(end_date).normalize()
+    if end < start:
+        return []
+    bounds = pd.date_range(start, end, freq=WINDOW_FREQUENCIES[window])
+    starts = [start] + [bound for bound in bounds if bound > start]
+    ends = [next_start - pd.Timedelta(days=1) for next_start in starts[1:]] + [end]
+    return [(s.date(), e.date()) for s, e in zip(starts, ends)]
+
+
+def complete_windows_end(today, min_age_days, window="month"):
+    """
+    Ostatni dzień ostatniego pełnego okna kończącego się co najmniej min_age_days dni
+    przed today. Okna backfillu kończące się na tej dacie mają stałe granice niezależne
+    od dnia uruchomienia, a archiwum ma już dla nich komplet danych.
+    """
+    cutoff = pd.Timestamp(today).normalize() - pd.Timedelta(days=min_age_days)
+    next_start = to_offset(WINDOW_FREQUENCIES[window]).rollback(cutoff + pd.Timedelta(days=1))
+    return (next_start - pd.Timedelta(days=1)).date()
+
+
+def backfill_historical_weather(
+    db, site, start_date, end_date, window="month", max_workers=MAX_WORKERS
+):
+    """
+    Backfill pogody rzeczywistej obiektu (sites.Site) oknami z backfill_windows: okna
+    pobierane są równolegle w puli wątków, a każde zapisywane do weather zaraz po pobraniu
+    i odnotowywane w tabeli weather_backfill. Okna zapisane wcześniej są pomijane, więc
+    przerwany backfill wznawia się od brakujących okien, a okna nieudane (nieodnotowane)
+    są ponawiane przy kolejnym wywołaniu z tym samym start_date. Zwraca DataFrame okien
+    (window_start, window_end, rows, status).
+    """
+    windows = backfill_windows(start_date, end_date, window)
+    done = db.get_backfill_windows(site.object_id)
+    pending = [w for w in windows if w not in done]
+    logger.info(
+        "Weather backfill for object %s: %d windows, %d already done, %d to fetch.",
+        site.object_id,
+        len(windows),
+        len(windows) - len(pending),
+        len(pending),
+    )
+    receiver = HistoricalWeatherDataReceiver(
+        latitude=site.latitude,
+        longitude=site.longitude,
+        start_date=start_date,
+        end_date=end_date,
+    )
+
+    def fetch_window(window_range):
+        window_start, window_end = window_range
+        data = receiver.fetch_historical_data(str(window_start), str(window_end))
+        return receiver.filter_complete_days(data)
+
+    results = [(w, None, "skipped") for w in windows if w in done]
+    if pending:
+        with ThreadPoolExecutor(max_workers=min(max_workers, len(pending))) as pool:
+            futures = {pool.submit(fetch_window, w): w for w in pending}
+            # zapis w wątku głównym, w kolejności ukończenia pobierania
+            for future in as_completed(futures):
+                window_start, window_end = futures[future]
+                try:
+                    data = future.result()
+                    if not data.empty:
+                        db.save_weather_data(data, "real", object_id=site.object_id)
+                    db.record_backfill_window(
+                        window_start, window_end, len(data), object_id=site.object_id
+                    )
+                except Exception as e:
+                    logger.error(
+                        "Weather backfill window %s - %s for object %s failed: %s",
+                        window_start,
+                        window_end,
+                        site.object_id,
+                        e,
+                    )
+                    results.append(((window_start, window_end), None, "failed"))
+                    continue
+                results.append(((window_start, window_end), len(data), "saved"))
+
+    summary = pd.DataFrame(
+        [(start, end, rows, status) for (start, end), rows, status in results],
+        columns=["window_start", "window_end", "rows", "status"],
+    )
+    summary["rows"] = summary["rows"].astype("Int64")
+    return summary.sort_values("window_start", ignore_index=True)
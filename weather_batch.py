@@ -0,0 +1,80 @@
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+# liczba lokalizacji w jednym zapytaniu Open-Meteo (współrzędne po przecinku, jedna
+# odpowiedź na lokalizację); ogranicza długość URL i koszt pojedynczego wywołania API
+SITES_PER_REQUEST = 50
+MAX_WORKERS = 4
+
+
+def hourly_frame(response, columns):
+    """
+    Dane godzinowe jednej odpowiedzi Open-Meteo jako DataFrame: date (UTC)
+    i kolumny columns w kolejności zmiennych "hourly" z zapytania.
+    """
+    hourly = response.Hourly()
+    data = {
+        "date": pd.date_range(
+            start=pd.to_datetime(hourly.Time(), unit="s", utc=True),
+            end=pd.to_datetime(hourly.TimeEnd(), unit="s", utc=True),
+            freq=pd.Timedelta(seconds=hourly.Interval()),
+            inclusive="left",
+        )
+    }
+    for i, column in enumerate(columns):
+        data[column] = hourly.Variables(i).ValuesAsNumpy()
+    return pd.DataFrame(data=data)
+
+
+def _fetch_batch(client, url, params, sites):
+    batch_params = {
+        **params,
+        "latitude": ",".join(str(site.latitude) for site in sites),
+        "longitude": ",".join(str(site.longitude) for site in sites),
+    }
+    responses = client.weather_api(url, params=batch_params)
+    if len(responses) != len(sites):
+        raise ValueError(
+            f"Open-Meteo zwróciło {len(responses)} odpowiedzi dla {len(sites)} lokalizacji"
+        )
+    return responses
+
+
+def fetch_sites(
+    client,
+    url,
+    params,
+    sites,
+    columns,
+    normalize,
+    sites_per_request=SITES_PER_REQUEST,
+    max_workers=MAX_WORKERS,
+):
+    """
+    Pobiera dane godzinowe dla wielu obiektów (sites.Site): lokalizacje grupowane są po
+    sites_per_request w jedno zapytanie wielolokalizacyjne, a zapytania wysyłane równolegle
+    w puli wątków. normalize(df) sprowadza czas odpowiedzi do czasu lokalnego odbiornika.
+    Zwraca jedną ramkę: object_id, date i kolumny columns, posortowaną po (object_id, date).
+    """
+    sites = list(sites)
+    if not sites:
+        return pd.DataFrame(columns=["object_id", "date", *columns])
+    batches = [
+        sites[start : start + sites_per_request]
+        for start in range(0, len(sites), sites_per_request)
+    ]
+    with ThreadPoolExecutor(max_workers=min(max_workers, len(batches))) as pool:
+        batch_responses = list(
+            pool.map(lambda batch: _fetch_batch(client, url, params, batch), batches)
+        )
+
+    frames = []
+    for batch, responses in zip(batches, batch_responses):
+        for site, response in zip(batch, responses):
+            df = normalize(hourly_frame(response, columns))
+            df.insert(0, "object_id", site.object_id)
+            frames.append(df)
+    return pd.concat(frames, ignore_index=True).sort_values(
+        ["object_id", "date"], kind="stable", ignore_index=True
+    )
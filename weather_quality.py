@@ -0,0 +1,80 @@
+import logging
+
+import numpy as np
+import pandas as pd
+
+HOURS_PER_DAY = 24
+
+logger = logging.getLogger(__name__)
+
+
+def filter_complete_days(df, date_col="date", by=(), return_report=False):
+    """
+    Zostawia tylko dni z kompletem godzin 0-23 i bez pustych wartości w żadnej kolumnie.
+    Kompletność liczona jest bez pętli po grupach: maska (dni x 24) obecnych godzin
+    i liczba wierszy z brakami na dzień. by: dodatkowe kolumny klucza dnia (np. object_id
+    dla ramki wielu obiektów). Nie modyfikuje df; zwraca przefiltrowaną kopię, a przy
+    return_report=True także raport pominiętych dni: klucz, date, hours (liczba obecnych
+    godzin), null_rows i reason ("incomplete hours", "missing values", "invalid date").
+    """
+    by = list(by)
+    dates = pd.to_datetime(df[date_col], errors="coerce")
+    day = dates.dt.normalize()
+    valid = day.notna().to_numpy()
+    group = df[by].assign(_day=day).groupby(
+        by + ["_day"], sort=False, dropna=False
+    ).ngroup().to_numpy()
+    n_groups = int(group.max()) + 1 if len(group) else 0
+
+    hours = np.zeros((n_groups, HOURS_PER_DAY), dtype=bool)
+    hour = dates.dt.hour.fillna(0).to_numpy(dtype=np.int64)
+    hours[group[valid], hour[valid]] = True
+    hour_counts = hours.sum(axis=1)
+    null_rows = np.bincount(
+        group, weights=df.isna().any(axis=1).to_numpy(), minlength=n_groups
+    ).astype(np.int64)
+    complete = (hour_counts == HOURS_PER_DAY) & (null_rows == 0)
+    keep = valid & complete[group]
+    result = df[keep].copy()
+    if not return_report:
+        return result
+
+    dropped = np.flatnonzero(~complete)
+    first_rows = pd.Series(np.arange(len(df))).groupby(group).first().to_numpy()
+    report = df.iloc[first_rows[dropped]][by].reset_index(drop=True)
+    report["date"] = day.iloc[first_rows[dropped]].dt.date.to_numpy()
+    report["hours"] = hour_counts[dropped]
+    report["null_rows"] = null_rows[dropped]
+    invalid_groups = np.zeros(n_groups, dtype=bool)
+    invalid_groups[group[~valid]] = True
+    report["reason"] = [
+        "invalid date"
+        if invalid_groups[g]
+        else ", ".join(
+            reason
+            for reason, failed in (
+                ("incomplete hours", hour_counts[g] < HOURS_PER_DAY),
+                ("missing values", null_rows[g] > 0),
+            )
+            if failed
+        )
+        for g in dropped
+    ]
+    return result, report
+
+
+def filter_complete_weather_days(df, date_col="date"):
+    """
+    filter_complete_days dla danych pogodowych odbiorników: date_col to kolumna godzinowa,
+    ramka wielu obiektów filtrowana jest osobno per object_id. Liczba pominiętych dni
+    i ich powody trafiają do logu, pełny raport na poziomie DEBUG. Zwraca kopię df.
+    """
+    by = ["object_id"] if "object_id" in df.columns else []
+    complete, dropped = filter_complete_days(df, date_col=date_col, by=by, return_report=True)
+    if not dropped.empty:
+        reasons = ", ".join(
+            f"{reason}: {count}" for reason, count in dropped["reason"].value_counts().items()
+        )
+        logger.info("Dropped %d incomplete weather days (%s)", len(dropped), reasons)
+        logger.debug("Dropped weather days:\n%s", dropped.to_string(index=False))
+    return complete